@@ -0,0 +1,110 @@
+'''
+Command line tool that replays recorded macro on many files.
+Every file is edited by headless TextEditorModel in one of worker processes.
+
+Usage:
+    python BatchEdit.py macro.json file1.txt file2.txt ... [--workers N] [--output-dir DIR]
+'''
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from TextEditorModel import TextEditorModel, Macro, readFileRows
+
+_workerMacro: Macro = None     # macro loaded once in every worker process
+
+
+def _initWorker(steps:list[list]):
+    global _workerMacro
+    _workerMacro = Macro(steps)
+
+
+def writeLines(path:str, lines:list[str], separator:str = '\n'):
+    '''
+    Writes rows into temporary file and replaces original with it, so failed write doesn't destroy the file.
+    Rows are joined by given separator exactly (no translation of line breaks), so file keeps its line endings.
+    '''
+    temporaryPath = path + '.tmp'
+    with open(temporaryPath, 'w', encoding='utf-8', newline='') as f:
+        f.write(lines[0])
+        for line in lines[1:]:
+            f.write(separator)
+            f.write(line)
+    os.replace(temporaryPath, path)
+
+
+def outputPaths(paths:list[str], outputDir:str) -> list[str]:
+    '''
+    Output files keep directory structure of input files below their common directory,
+    so a/x.txt and b/x.txt don't overwrite each other.
+    '''
+    absolutePaths = [os.path.abspath(path) for path in paths]
+    base = os.path.commonpath([os.path.dirname(path) for path in absolutePaths])
+    return [os.path.join(outputDir, os.path.relpath(path, base)) for path in absolutePaths]
+
+
+def editFile(paths:tuple[str, str]) -> tuple[str, int, float, str]:
+    '''
+    Runs in worker process. Replays macro on input file and writes result to output file.
+    Returns (input path, size of input in bytes, seconds, error message or None).
+    '''
+    inputPath, outputPath = paths
+    start = time.perf_counter()
+    try:
+        size = os.path.getsize(inputPath)
+        lines, separator = readFileRows(inputPath)
+        model = TextEditorModel.fromLines(lines)
+        _workerMacro.replay(model)
+        writeLines(outputPath, model.lines, separator)
+    except (OSError, UnicodeError, ValueError) as e:
+        return inputPath, 0, time.perf_counter() - start, str(e)
+    return inputPath, size, time.perf_counter() - start, None
+
+
+def main(argv:list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='Replays recorded macro on many files in parallel.')
+    parser.add_argument('macro', help='macro saved from editor (JSON)')
+    parser.add_argument('files', nargs='+', help='files to edit')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='number of worker processes')
+    parser.add_argument('--output-dir', help='write edited files here instead of overwriting them')
+    args = parser.parse_args(argv)
+
+    macro = Macro.load(args.macro)
+    paths = []
+    seen = set()
+    for path in args.files:
+        '''file given twice would be edited by two workers at once'''
+        if os.path.realpath(path) not in seen:
+            seen.add(os.path.realpath(path))
+            paths.append(path)
+    if args.output_dir:
+        jobs = list(zip(paths, outputPaths(paths, args.output_dir)))
+        for directory in {os.path.dirname(outputPath) for _, outputPath in jobs}:
+            os.makedirs(directory, exist_ok=True)
+    else:
+        jobs = [(path, path) for path in paths]
+
+    failed = 0
+    totalBytes = 0
+    start = time.perf_counter()
+    chunksize = max(1, len(jobs) // (args.workers * 8))    # bigger chunks -> less communication with workers
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_initWorker, initargs=(macro.steps,)) as executor:
+        for path, size, seconds, error in executor.map(editFile, jobs, chunksize=chunksize):
+            if error is not None:
+                failed += 1
+                print(f"{path}: FAILED ({error})", file=sys.stderr)
+                continue
+            totalBytes += size
+            print(f"{path}: {size} B in {seconds * 1000:.1f} ms")
+    elapsed = time.perf_counter() - start
+
+    edited = len(jobs) - failed
+    print(f"{edited} files edited, {failed} failed, {totalBytes / 1e6:.2f} MB in {elapsed:.2f} s "
+          f"({edited / elapsed:.1f} files/s, {totalBytes / 1e6 / elapsed:.2f} MB/s)")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,598 @@
+'''
+Collaborative editing of one document by more editors (operational transformation).
+Every change of TextEditorModel (EditDelta) becomes TextOperation, which is sent to CollaborationServer. Server transforms it
+against operations which the client hadn't seen yet, applies it and broadcasts accepted operations in batches.
+Messages are length-prefixed JSON, bigger ones are compressed with zlib.
+
+Usage:
+    python Collaboration.py serve [--host HOST] [--port PORT | --unix PATH] [--file FILE]
+    python Collaboration.py edit [--host HOST] [--port PORT | --unix PATH]
+'''
+import argparse
+import asyncio
+import json
+import queue
+import struct
+import threading
+import time
+import zlib
+
+from TextEditorModel import TextEditorModel, EditObserver, EditDelta, Location, LocationRange, TextView, UndoManager, readFileLines
+
+BATCH_INTERVAL = 0.01       # seconds between two broadcasts of server
+COMPRESSION_THRESHOLD = 256     # messages with more bytes are compressed
+POLL_MS = 15    # how often editor (Tk thread) takes received messages
+
+
+class TextOperation:
+    '''
+    Change of whole document as list of components: positive int -> retain characters, negative int -> delete characters,
+    str -> insert text. baseLength is length of document before operation, targetLength after it.
+    '''
+    __slots__ = ('ops', 'baseLength', 'targetLength')
+
+    def __init__(self):
+        self.ops: list = []
+        self.baseLength = 0
+        self.targetLength = 0
+
+    def retain(self, n:int) -> 'TextOperation':
+        if n == 0:
+            return self
+        self.baseLength += n
+        self.targetLength += n
+        if self.ops and _isRetain(self.ops[-1]):
+            self.ops[-1] += n
+        else:
+            self.ops.append(n)
+        return self
+
+    def insert(self, text:str) -> 'TextOperation':
+        if text == '':
+            return self
+        self.targetLength += len(text)
+        ops = self.ops
+        if ops and isinstance(ops[-1], str):
+            ops[-1] += text
+        elif ops and _isDelete(ops[-1]):
+            # insert is always kept before delete -> equal operations have equal components
+            if len(ops) > 1 and isinstance(ops[-2], str):
+                ops[-2] += text
+            else:
+                ops.insert(len(ops) - 1, text)
+        else:
+            ops.append(text)
+        return self
+
+    def delete(self, n:int) -> 'TextOperation':
+        if n == 0:
+            return self
+        n = abs(n)
+        self.baseLength += n
+        if self.ops and _isDelete(self.ops[-1]):
+            self.ops[-1] -= n
+        else:
+            self.ops.append(-n)
+        return self
+
+    def isNoop(self) -> bool:
+        return all(_isRetain(op) for op in self.ops)
+
+    @classmethod
+    def fromList(cls, ops:list) -> 'TextOperation':
+        operation = cls()
+        for op in ops:
+            if isinstance(op, str):
+                operation.insert(op)
+            elif op > 0:
+                operation.retain(op)
+            else:
+                operation.delete(op)
+        return operation
+
+    @classmethod
+    def fromDelta(cls, textEditorModel:TextEditorModel, delta:EditDelta) -> 'TextOperation':
+        '''Creates operation from change which was just made on model (model already contains new text).'''
+        statistics = textEditorModel.statistics
+        insertedLength = statistics.charactersBefore(delta.newEnd) - delta.startOffset
+        inserted = str(TextView(textEditorModel.lines, LocationRange(delta.start, delta.newEnd), insertedLength))
+        baseLength = statistics.characterCount - insertedLength + delta.removedLength
+        return cls().retain(delta.startOffset).delete(delta.removedLength).insert(inserted) \
+            .retain(baseLength - delta.startOffset - delta.removedLength)
+
+    def compose(self, other:'TextOperation') -> 'TextOperation':
+        '''Returns one operation with the same effect as this operation followed by other.'''
+        if self.targetLength != other.baseLength:
+            raise ValueError("Operations can't be composed: lengths don't match")
+        result = TextOperation()
+        ops1, ops2 = self.ops, other.ops
+        i1 = i2 = 0
+        op1 = ops1[0] if ops1 else None
+        op2 = ops2[0] if ops2 else None
+
+        def next1():
+            nonlocal i1
+            i1 += 1
+            return ops1[i1] if i1 < len(ops1) else None
+
+        def next2():
+            nonlocal i2
+            i2 += 1
+            return ops2[i2] if i2 < len(ops2) else None
+
+        while op1 is not None or op2 is not None:
+            if op1 is not None and _isDelete(op1):
+                result.delete(op1)
+                op1 = next1()
+                continue
+            if isinstance(op2, str):
+                result.insert(op2)
+                op2 = next2()
+                continue
+            if op1 is None or op2 is None:
+                raise ValueError("Operations can't be composed")
+            if _isRetain(op1) and _isRetain(op2):
+                if op1 > op2:
+                    result.retain(op2)
+                    op1 -= op2
+                    op2 = next2()
+                elif op1 == op2:
+                    result.retain(op1)
+                    op1, op2 = next1(), next2()
+                else:
+                    result.retain(op1)
+                    op2 -= op1
+                    op1 = next1()
+            elif isinstance(op1, str) and _isDelete(op2):
+                if len(op1) > -op2:
+                    op1 = op1[-op2:]
+                    op2 = next2()
+                elif len(op1) == -op2:
+                    op1, op2 = next1(), next2()
+                else:
+                    op2 += len(op1)
+                    op1 = next1()
+            elif isinstance(op1, str) and _isRetain(op2):
+                if len(op1) > op2:
+                    result.insert(op1[:op2])
+                    op1 = op1[op2:]
+                    op2 = next2()
+                elif len(op1) == op2:
+                    result.insert(op1)
+                    op1, op2 = next1(), next2()
+                else:
+                    result.insert(op1)
+                    op2 -= len(op1)
+                    op1 = next1()
+            else:   # retain and delete
+                if op1 > -op2:
+                    result.delete(op2)
+                    op1 += op2
+                    op2 = next2()
+                elif op1 == -op2:
+                    result.delete(op2)
+                    op1, op2 = next1(), next2()
+                else:
+                    result.delete(op1)
+                    op2 += op1
+                    op1 = next1()
+        return result
+
+    @staticmethod
+    def transform(operation1:'TextOperation', operation2:'TextOperation') -> tuple['TextOperation', 'TextOperation']:
+        '''
+        Both operations were made on the same document. Returns (operation1', operation2') so that
+        operation1 followed by operation2' gives the same text as operation2 followed by operation1'.
+        When both insert at the same place, text of operation1 goes first.
+        '''
+        if operation1.baseLength != operation2.baseLength:
+            raise ValueError("Operations can't be transformed: lengths don't match")
+        prime1, prime2 = TextOperation(), TextOperation()
+        ops1, ops2 = operation1.ops, operation2.ops
+        i1 = i2 = 0
+        op1 = ops1[0] if ops1 else None
+        op2 = ops2[0] if ops2 else None
+
+        def next1():
+            nonlocal i1
+            i1 += 1
+            return ops1[i1] if i1 < len(ops1) else None
+
+        def next2():
+            nonlocal i2
+            i2 += 1
+            return ops2[i2] if i2 < len(ops2) else None
+
+        while op1 is not None or op2 is not None:
+            if isinstance(op1, str):
+                prime1.insert(op1)
+                prime2.retain(len(op1))
+                op1 = next1()
+                continue
+            if isinstance(op2, str):
+                prime1.retain(len(op2))
+                prime2.insert(op2)
+                op2 = next2()
+                continue
+            if op1 is None or op2 is None:
+                raise ValueError("Operations can't be transformed")
+            if _isRetain(op1) and _isRetain(op2):
+                if op1 > op2:
+                    length = op2
+                    op1 -= op2
+                    op2 = next2()
+                elif op1 == op2:
+                    length = op2
+                    op1, op2 = next1(), next2()
+                else:
+                    length = op1
+                    op2 -= op1
+                    op1 = next1()
+                prime1.retain(length)
+                prime2.retain(length)
+            elif _isDelete(op1) and _isDelete(op2):
+                # both deleted the same text -> nothing left to do
+                if -op1 > -op2:
+                    op1 -= op2
+                    op2 = next2()
+                elif op1 == op2:
+                    op1, op2 = next1(), next2()
+                else:
+                    op2 -= op1
+                    op1 = next1()
+            elif _isDelete(op1):    # delete and retain
+                if -op1 > op2:
+                    length = op2
+                    op1 += op2
+                    op2 = next2()
+                elif -op1 == op2:
+                    length = op2
+                    op1, op2 = next1(), next2()
+                else:
+                    length = -op1
+                    op2 += op1
+                    op1 = next1()
+                prime1.delete(length)
+            else:   # retain and delete
+                if op1 > -op2:
+                    length = -op2
+                    op1 += op2
+                    op2 = next2()
+                elif op1 == -op2:
+                    length = op1
+                    op1, op2 = next1(), next2()
+                else:
+                    length = op1
+                    op2 += op1
+                    op1 = next1()
+                prime2.delete(length)
+        return prime1, prime2
+
+
+def _isRetain(op) -> bool:
+    return not isinstance(op, str) and op > 0
+
+def _isDelete(op) -> bool:
+    return not isinstance(op, str) and op < 0
+
+
+def applyOperation(textEditorModel:TextEditorModel, operation:TextOperation):
+    '''Applies operation on model. Neighbouring inserts and deletes are applied as one replacement.'''
+    statistics = textEditorModel.statistics
+    ops = operation.ops
+    offset = 0
+    i = 0
+    while i < len(ops):
+        if _isRetain(ops[i]):
+            offset += ops[i]
+            i += 1
+            continue
+        inserted = ''
+        deleted = 0
+        while i < len(ops) and not _isRetain(ops[i]):
+            if isinstance(ops[i], str):
+                inserted += ops[i]
+            else:
+                deleted -= ops[i]
+            i += 1
+        start = statistics.locationAt(offset)
+        end = statistics.locationAt(offset + deleted)
+        textEditorModel._performReplace(start, end, inserted)
+        offset += len(inserted)
+
+
+def encodeMessage(message:dict) -> bytes:
+    '''Returns frame: 4 bytes length, 1 byte flag (1 = compressed) and JSON payload.'''
+    return framePayload(json.dumps(message, separators=(',', ':')).encode('utf-8'))
+
+def framePayload(payload:bytes) -> bytes:
+    compressed = 0
+    if len(payload) > COMPRESSION_THRESHOLD:
+        payload = zlib.compress(payload, 1)
+        compressed = 1
+    return struct.pack('>IB', len(payload), compressed) + payload
+
+async def readMessage(reader:asyncio.StreamReader) -> dict:
+    '''Reads one frame, returns None when connection was closed.'''
+    try:
+        header = await reader.readexactly(5)
+        length, compressed = struct.unpack('>IB', header)
+        payload = await reader.readexactly(length)
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return None
+    if compressed:
+        payload = zlib.decompress(payload)
+    return json.loads(payload)
+
+
+class CollaborationServer:
+    '''
+    Keeps authoritative document (headless TextEditorModel) and history of accepted operations.
+    Accepted operations are broadcast to all clients once per BATCH_INTERVAL, as one message.
+    '''
+    def __init__(self, text:str = '', batchInterval:float = BATCH_INTERVAL):
+        self.textEditorModel = TextEditorModel(text)
+        self.history: list[TextOperation] = []     # revision of document == len(history)
+        self.writers: dict[int, asyncio.StreamWriter] = {}
+        self.clientTasks: set[asyncio.Task] = set()     # running handleClient tasks
+        self.nextClientId = 0
+        self.outgoing: list[list] = []      # [clientId, ops] accepted since last broadcast
+        self.outgoingRevision = 0       # revision of first operation in outgoing
+        self.batchInterval = batchInterval
+        self.rawBytes = 0       # broadcast bytes without compression
+        self.sentBytes = 0
+        self.server = None
+        self.broadcastTask = None
+
+    async def start(self, host:str = '127.0.0.1', port:int = 0, path:str = None):
+        '''Starts listening on TCP (host, port) or on Unix socket (path).'''
+        if path is not None:
+            self.server = await asyncio.start_unix_server(self.handleClient, path)
+        else:
+            self.server = await asyncio.start_server(self.handleClient, host, port)
+        self.broadcastTask = asyncio.create_task(self.broadcastLoop())
+        return self.server
+
+    async def stop(self):
+        '''Stops listening, disconnects all clients and waits until their handlers finish.'''
+        self.server.close()
+        tasks = [self.broadcastTask, *self.clientTasks]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.server.wait_closed()
+
+    async def handleClient(self, reader:asyncio.StreamReader, writer:asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self.clientTasks.add(task)
+        clientId = self.nextClientId
+        self.nextClientId += 1
+        self.writers[clientId] = writer
+        writer.write(encodeMessage({'t': 'init', 'id': clientId, 'rev': len(self.history), 'text': '\r'.join(self.textEditorModel.lines)}))
+        try:
+            while True:
+                message = await readMessage(reader)
+                if message is None:
+                    break
+                if message['t'] == 'op':
+                    self.receive(clientId, message['rev'], TextOperation.fromList(message['op']))
+        except asyncio.CancelledError:
+            pass    # server is stopping
+        finally:
+            del self.writers[clientId]
+            self.clientTasks.discard(task)
+            writer.close()
+
+    def receive(self, clientId:int, revision:int, operation:TextOperation):
+        '''Operation was made on given revision -> transform it over newer operations, apply it and queue it for broadcast.'''
+        for concurrent in self.history[revision:]:
+            operation = TextOperation.transform(operation, concurrent)[0]
+        applyOperation(self.textEditorModel, operation)
+        if not self.outgoing:
+            self.outgoingRevision = len(self.history)
+        self.history.append(operation)
+        self.outgoing.append([clientId, operation.ops])
+
+    async def broadcastLoop(self):
+        while True:
+            await asyncio.sleep(self.batchInterval)
+            if not self.outgoing:
+                continue
+            payload = json.dumps({'t': 'batch', 'rev': self.outgoingRevision, 'ops': self.outgoing}, separators=(',', ':')).encode('utf-8')
+            frame = framePayload(payload)
+            self.outgoing = []
+            for writer in list(self.writers.values()):
+                writer.write(frame)
+                self.rawBytes += len(payload) + 5
+                self.sentBytes += len(frame)
+            await asyncio.gather(*(writer.drain() for writer in list(self.writers.values())), return_exceptions=True)
+
+
+class CollaborationClient(EditObserver):
+    '''
+    Connects TextEditorModel to CollaborationServer.
+    Only one operation waits for confirmation of server, changes made meanwhile are composed into one buffered operation.
+    Received batch is applied with one notification of cursor and text observers.
+    By default received messages are handled in thread of asyncio loop, editor with its own loop gives deliver function.
+    '''
+    def __init__(self, textEditorModel:TextEditorModel, deliver=None, measureLatency:bool = False):
+        self.textEditorModel = textEditorModel
+        self.deliver = deliver if deliver is not None else self.receive
+        self.clientId = None
+        self.revision = 0
+        self.outstanding: TextOperation = None     # sent, not confirmed yet
+        self.buffer: TextOperation = None          # made while waiting for confirmation
+        self.applyingRemote = False
+        self.latencies: list[float] = [] if measureLatency else None
+        self.outstandingTimes: list[float] = []     # when changes in outstanding operation were made
+        self.bufferTimes: list[float] = []
+        self.loop = None
+        self.writer = None
+        self.readTask = None
+
+    async def connect(self, host:str = '127.0.0.1', port:int = None, path:str = None):
+        if path is not None:
+            reader, self.writer = await asyncio.open_unix_connection(path)
+        else:
+            reader, self.writer = await asyncio.open_connection(host, port)
+        self.loop = asyncio.get_running_loop()
+        self.readTask = asyncio.create_task(self.readLoop(reader))
+
+    async def readLoop(self, reader:asyncio.StreamReader):
+        while True:
+            message = await readMessage(reader)
+            if message is None:
+                break
+            self.deliver(message)
+
+    def close(self):
+        '''Disconnects from server (can be called from any thread).'''
+        self.textEditorModel.dettachEditObserver(self)
+        if self.writer is not None:
+            self.loop.call_soon_threadsafe(self.readTask.cancel)
+            self.loop.call_soon_threadsafe(self.writer.close)
+
+    async def disconnect(self):
+        '''Disconnects from server and waits until connection is closed (called in thread of asyncio loop).'''
+        self.textEditorModel.dettachEditObserver(self)
+        if self.writer is not None:
+            self.readTask.cancel()
+            self.writer.close()
+            await asyncio.gather(self.readTask, self.writer.wait_closed(), return_exceptions=True)
+
+    def isSynchronized(self) -> bool:
+        return self.clientId is not None and self.outstanding is None and self.buffer is None
+
+    def receive(self, message:dict):
+        '''Handles message from server (has to be called in thread which owns the model).'''
+        if message['t'] == 'init':
+            self._initialize(message)
+        elif message['t'] == 'batch':
+            self._receiveBatch(message)
+
+    def updateEdit(self, delta:EditDelta):
+        '''Local change -> send it (or buffer it if previous change wasn't confirmed yet).'''
+        if self.applyingRemote:
+            return
+        operation = TextOperation.fromDelta(self.textEditorModel, delta)
+        now = time.perf_counter()
+        if self.outstanding is None:
+            self.outstanding = operation
+            self.outstandingTimes = [now]
+            self._send(operation)
+        elif self.buffer is None:
+            self.buffer = operation
+            self.bufferTimes = [now]
+        else:
+            self.buffer = self.buffer.compose(operation)
+            self.bufferTimes.append(now)
+
+    def _send(self, operation:TextOperation):
+        self.loop.call_soon_threadsafe(self.writer.write, encodeMessage({'t': 'op', 'rev': self.revision, 'op': operation.ops}))
+
+    def _initialize(self, message:dict):
+        model = self.textEditorModel
+        self.clientId = message['id']
+        self.revision = message['rev']
+        self.applyingRemote = True
+        last = len(model.lines) - 1
+        model._performReplace(Location(0, 0), Location(last, len(model.lines[last])), message['text'])
+        self.applyingRemote = False
+        model.cursorLocation = Location(0, 0)
+        model.selectionRange = LocationRange(Location(0, 0), Location(0, 0))
+        model.attachEditObserver(self)
+        model.notifyCursorObservers()
+        model.notifyTextObservers()
+
+    def _receiveBatch(self, message:dict):
+        model = self.textEditorModel
+        changed = False
+        self.applyingRemote = True
+        for revision, (clientId, ops) in enumerate(message['ops'], message['rev']):
+            if revision < self.revision:
+                '''operation was already part of text sent in init message'''
+                continue
+            if clientId == self.clientId:
+                self._serverAck()
+            else:
+                self._applyServer(TextOperation.fromList(ops))
+                changed = True
+        self.applyingRemote = False
+        if changed:
+            # saved states of local actions don't contain remote changes -> they can't be undone any more
+            UndoManager().clear()
+            model.notifyCursorObservers()
+            model.notifyTextObservers()
+
+    def _serverAck(self):
+        self.revision += 1
+        if self.latencies is not None:
+            now = time.perf_counter()
+            self.latencies.extend(now - t for t in self.outstandingTimes)
+        self.outstanding, self.outstandingTimes = self.buffer, self.bufferTimes
+        self.buffer, self.bufferTimes = None, []
+        if self.outstanding is not None:
+            self._send(self.outstanding)
+
+    def _applyServer(self, operation:TextOperation):
+        self.revision += 1
+        if self.outstanding is not None:
+            self.outstanding, operation = TextOperation.transform(self.outstanding, operation)
+        if self.buffer is not None:
+            self.buffer, operation = TextOperation.transform(self.buffer, operation)
+        applyOperation(self.textEditorModel, operation)
+
+
+def connectEditor(textEditor, host:str = '127.0.0.1', port:int = None, path:str = None) -> CollaborationClient:
+    '''
+    Connects editor to server. Asyncio loop runs in background thread, received messages are passed to Tk thread
+    through queue, so model is changed only by Tk thread.
+    '''
+    messages = queue.Queue()
+    client = CollaborationClient(textEditor.textEditorModel, deliver=messages.put)
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    asyncio.run_coroutine_threadsafe(client.connect(host, port, path), loop).result()
+
+    def poll():
+        while not messages.empty():
+            client.receive(messages.get_nowait())
+        textEditor.after(POLL_MS, poll)
+    poll()
+    return client
+
+
+def main(argv:list[str] = None):
+    parser = argparse.ArgumentParser(description='Collaborative editing server and editor.')
+    parser.add_argument('command', choices=['serve', 'edit'])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', help='use Unix socket at given path instead of TCP')
+    parser.add_argument('--file', help='initial text of document (serve only)')
+    args = parser.parse_args(argv)
+
+    if args.command == 'serve':
+        text = ''
+        if args.file:
+            text = '\r'.join(readFileLines(args.file))
+
+        async def serve():
+            server = CollaborationServer(text)
+            await server.start(args.host, args.port, args.unix)
+            print(f"Serving on {args.unix or f'{args.host}:{args.port}'}")
+            await asyncio.Event().wait()
+        asyncio.run(serve())
+    else:
+        from tkinter import Tk, X, BOTTOM, SUNKEN
+        from TextEditorModel import TextEditor, StatusBar
+        root = Tk()
+        root.title("Text Editor (collaborative)")
+        textEditor = TextEditor(root, TextEditorModel(''), width=400, height=400)
+        textEditor.pack()
+        StatusBar(root, textEditor.textEditorModel, textEditor.clipboard, bd=1, relief=SUNKEN).pack(side=BOTTOM, fill=X)
+        connectEditor(textEditor, args.host, args.port, args.unix)
+        root.mainloop()
+
+
+if __name__ == '__main__':
+    main()
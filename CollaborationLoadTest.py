@@ -0,0 +1,96 @@
+'''
+Load test of collaboration server: N simulated typists edit one document at the same time.
+Reports operation latency (change made -> confirmed by server), time until all editors converge and compression ratio.
+
+Usage:
+    python CollaborationLoadTest.py [--typists N] [--seconds S] [--interval MS] [--unix PATH]
+'''
+import argparse
+import asyncio
+import random
+import string
+import sys
+import time
+
+from TextEditorModel import TextEditorModel, Location
+from Collaboration import CollaborationServer, CollaborationClient
+
+
+async def typeRandomly(client:CollaborationClient, seconds:float, interval:float, rng:random.Random) -> int:
+    '''Makes random inserts and backspaces at random places until time runs out. Returns number of changes.'''
+    model = client.textEditorModel
+    changes = 0
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        row = rng.randrange(len(model.lines))
+        model.cursorLocation = Location(row, rng.randint(0, len(model.lines[row])))
+        if rng.random() < 0.75:
+            model._performInsert(rng.choice(string.ascii_letters + '  \r'))
+        else:
+            model._performDeleteBefore()
+        changes += 1
+        await asyncio.sleep(interval)
+    return changes
+
+
+def percentile(values:list[float], p:float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+async def run(typists:int, seconds:float, interval:float, path:str = None) -> bool:
+    server = CollaborationServer('Hello\rworld')
+    await server.start(port=0, path=path)
+    port = None if path else server.server.sockets[0].getsockname()[1]
+
+    clients = [CollaborationClient(TextEditorModel(''), measureLatency=True) for _ in range(typists)]
+    for client in clients:
+        await client.connect(port=port, path=path)
+    while not all(client.isSynchronized() for client in clients):
+        await asyncio.sleep(0.001)
+
+    rng = random.Random(1)
+    start = time.perf_counter()
+    changes = sum(await asyncio.gather(*(typeRandomly(client, seconds, interval, random.Random(rng.random())) for client in clients)))
+    typingEnd = time.perf_counter()
+    revision = len(server.history)
+    while not all(client.isSynchronized() and client.revision == len(server.history) for client in clients) \
+            or len(server.history) != revision:
+        revision = len(server.history)
+        await asyncio.sleep(0.001)
+    convergence = time.perf_counter() - typingEnd
+    elapsed = time.perf_counter() - start
+
+    converged = all(client.textEditorModel.lines == server.textEditorModel.lines for client in clients)
+    latencies = [latency * 1000 for client in clients for latency in client.latencies]
+    await asyncio.gather(*(client.disconnect() for client in clients))
+    await server.stop()
+
+    print(f"{typists} typists, {changes} changes in {elapsed:.2f} s ({changes / elapsed:.0f} changes/s), "
+          f"{len(server.history)} operations accepted by server")
+    if latencies:
+        print(f"latency [ms]: p50 {percentile(latencies, 0.5):.2f}, p95 {percentile(latencies, 0.95):.2f}, "
+              f"p99 {percentile(latencies, 0.99):.2f}, max {max(latencies):.2f}")
+    else:
+        print("latency [ms]: no operations were confirmed")
+    print(f"convergence after typing stopped: {convergence * 1000:.1f} ms, documents {'equal' if converged else 'DIFFERENT'} "
+          f"({len(server.textEditorModel.lines)} lines, {server.textEditorModel.statistics.characterCount} characters)")
+    print(f"broadcast: {server.sentBytes / 1e3:.1f} kB sent, {server.rawBytes / 1e3:.1f} kB before compression")
+    return converged
+
+
+def main(argv:list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='Simulates many editors typing into one shared document.')
+    parser.add_argument('--typists', type=int, default=10)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--interval', type=float, default=20, help='milliseconds between two changes of one typist')
+    parser.add_argument('--unix', help='use Unix socket at given path instead of TCP')
+    args = parser.parse_args(argv)
+    if args.typists < 1 or args.seconds <= 0 or args.interval < 0:
+        parser.error('--typists and --seconds have to be positive and --interval non-negative')
+    converged = asyncio.run(run(args.typists, args.seconds, args.interval / 1000, args.unix))
+    return 0 if converged else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,9 +1,20 @@
 from tkinter import *
+from tkinter import filedialog
 from functools import total_ordering
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from bisect import bisect_left
+import random
+import json
 
 COLLUMN_START = 5
 ROW_HEIGHT = 20
 CHAR_WIDTH = 11  # approximation for Courier style
+GUTTER_WIDTH = 3    # width of diff marker left from text
+DIFF_PROCESS_COST = 200000     # comparisons with bigger estimated cost (lines + edits^2) run in another process
+DIFF_MAX_EDIT_DISTANCE = 2000   # Myers gives up after this many edits and reports whole region as one hunk
+DIFF_REFRESH_MS = 300   # how often editor checks whether comparison has to be refreshed
+STATISTICS_BLOCK_SIZE = 256     # number of rows in one block of DocumentStatistics
 
 
 
@@ -15,6 +26,21 @@ class TextEditorModel:
         self.cursorLocation = Location(0,0)      # coordinates of current cursor location
         self.cursorObservers: list[CursorObserver] = []     # list of cursor observers subscribed to this subject
         self.textObservers: list[TextObserver] = []         # list of text observers subscribed to this subject
+        self.editObservers: list[EditObserver] = []         # list of edit observers subscribed to this subject
+        self.marks = MarkTree()     # marks (bookmarks, anchors...) which follow edits
+        self.statistics = DocumentStatistics(self.lines)    # counts of lines, characters and words
+        self.folds = FoldTree()     # folded (hidden) regions of rows
+        self.openEditDeltas: list[EditDelta] = None     # collects deltas of action which is being executed
+        self.macro: Macro = None    # macro which is being recorded (if any)
+        self.selectionAnchor: Mark = None   # where selection started (shift pressed), follows edits
+
+    @classmethod
+    def fromLines(cls, lines:list[str]) -> 'TextEditorModel':
+        '''Creates model from already split rows (used when file is read row by row).'''
+        model = cls('')
+        model.lines = lines
+        model.statistics = DocumentStatistics(lines)
+        return model
     
     def allLines(self):
         '''Returns iterator/generator that goes through all lines of document'''
@@ -46,6 +72,14 @@ class TextEditorModel:
             self.textObservers.remove(observer)
 
 
+    def attachEditObserver(self, observer:'EditObserver'):
+        '''This method attaches new edit observer to this subject.'''
+        self.editObservers.append(observer)
+    def dettachEditObserver(self, observer:'EditObserver'):
+        '''This method dettaches edit observer from this subject.'''
+        if observer in self.editObservers:
+            self.editObservers.remove(observer)
+
     def notifyCursorObservers(self):
         '''Notifying all cursor observers that a change was made.'''
         for o in self.cursorObservers:
@@ -54,84 +88,280 @@ class TextEditorModel:
         '''Notifying all text observers that a change was mafe.'''
         for to in self.textObservers:
             to.updateText()
+    def notifyEditObservers(self, delta:'EditDelta'):
+        '''Notifying all edit observers which part of text was changed.'''
+        for eo in self.editObservers:
+            eo.updateEdit(delta)
     
+    def addMark(self, location:'Location') -> 'Mark':
+        '''Creates mark at given location. Mark keeps pointing at the same text while document is edited.'''
+        return self.marks.add(location)
+    def removeMark(self, mark:'Mark'):
+        '''Removes mark created by addMark().'''
+        self.marks.remove(mark)
+
+    def _recordEdit(self, delta:'EditDelta'):
+        '''Called by every _perform* method after text was changed. Updates statistics, shifts marks and notifies edit observers.'''
+        # statistics still describe text before edit -> offsets of removed text
+        delta.startOffset = self.statistics.charactersBefore(delta.start)
+        delta.removedLength = self.statistics.charactersBefore(delta.oldEnd) - delta.startOffset
+        self.statistics.update(self.lines, delta)
+        self.marks.shift(delta)
+        self.folds.shift(delta)
+        if self.openEditDeltas is not None:
+            self.openEditDeltas.append(delta)
+        self.notifyEditObservers(delta)
+
+    def _beginEditDeltas(self):
+        '''Starts collecting deltas made by one action.'''
+        self.openEditDeltas = []
+    def _endEditDeltas(self) -> list['EditDelta']:
+        '''
+        Stops collecting deltas and returns deltas made since _beginEditDeltas().
+        Delta which replaces exactly the text produced by previous one is joined with it (deletion of selection + insertion).
+        Undo restores all lines at once and then reverts the deltas one by one, reading rows from the restored lines ->
+        reverted deltas must not overlap, otherwise statistics would be computed from wrong rows and marks shifted twice.
+        '''
+        deltas, self.openEditDeltas = self.openEditDeltas, None
+        joined = []
+        for delta in deltas:
+            if joined and joined[-1].start == delta.start and joined[-1].newEnd == delta.oldEnd:
+                previous = joined.pop()
+                delta = EditDelta(previous.start, previous.oldEnd, delta.newEnd)
+            joined.append(delta)
+        return joined
+
+    def _revertEditDeltas(self, deltas:list['EditDelta']):
+        '''Used by undo -> after old lines are restored, marks have to be shifted back.'''
+        for delta in reversed(deltas):
+            self._recordEdit(delta.inverted())
+
+    def _restoreLines(self, lines:list[str]):
+        '''
+        Replaces all lines by saved ones (undo of action with many edits). Rows between equal first and last rows
+        are reported as one changed region, so statistics, marks and folds stay consistent.
+        '''
+        current = self.lines
+        self.lines = lines
+        if current == lines:
+            return
+        limit = min(len(current), len(lines)) - 1
+        first = 0
+        while first < limit and current[first] == lines[first]:
+            first += 1
+        common = 0
+        while common < limit - first and current[-1-common] == lines[-1-common]:
+            common += 1
+        currentLast, lastRow = len(current) - 1 - common, len(lines) - 1 - common
+        self._recordEdit(EditDelta(Location(first, 0), Location(currentLast, len(current[currentLast])), Location(lastRow, len(lines[lastRow]))))
+
+    def fold(self, startRow:int, endRow:int) -> bool:
+        '''Hides rows startRow+1 until endRow. If cursor was hidden, it is moved to the header row.'''
+        endRow = min(endRow, len(self.lines) - 1)
+        if not self.folds.add(startRow, endRow):
+            return False
+        cursor = self.cursorLocation
+        if self.folds.foldContaining(cursor.row) is not None:
+            header = self.folds.foldContaining(cursor.row)[0]
+            self.cursorLocation = Location(header, min(cursor.column, len(self.lines[header])))
+            self.notifyCursorObservers()
+        self.notifyTextObservers()
+        return True
+
+    def foldIndentationBlock(self, row:int) -> bool:
+        '''Folds rows after given row which are more indented than it (empty rows inside block are included).'''
+        indentation = len(self.lines[row]) - len(self.lines[row].lstrip())
+        endRow = row
+        for i in range(row + 1, len(self.lines)):
+            line = self.lines[i]
+            if not line.strip():
+                continue
+            if len(line) - len(line.lstrip()) <= indentation:
+                break
+            endRow = i
+        return self.fold(row, endRow)
+
+    def unfold(self, row:int) -> bool:
+        '''Unfolds fold whose header is given row (or which hides given row).'''
+        fold = self.folds.foldContaining(row) or self.folds.foldAt(row)
+        if fold is None:
+            return False
+        self.folds.remove(fold[0])
+        self.notifyTextObservers()
+        return True
+
+    def unfoldAll(self):
+        self.folds.clear()
+        self.notifyTextObservers()
+
+    def _rowAbove(self, row:int) -> int:
+        '''Returns nearest visible row above given row, or None.'''
+        if row == 0:
+            return None
+        fold = self.folds.foldContaining(row - 1)
+        return fold[0] if fold is not None else row - 1
+
+    def _rowBelow(self, row:int) -> int:
+        '''Returns nearest visible row below given row, or None.'''
+        fold = self.folds.foldAt(row) or self.folds.foldContaining(row)
+        below = fold[1] + 1 if fold is not None else row + 1
+        return below if below < len(self.lines) else None
+
+    def startMacroRecording(self) -> 'Macro':
+        '''Starts recording of edits and cursor moves. Current cursor location is the first step.'''
+        self.macro = Macro()
+        self._recordMacroStep('moveCursorTo', self.cursorLocation.row, self.cursorLocation.column)
+        return self.macro
+    def stopMacroRecording(self) -> 'Macro':
+        '''Stops recording and returns recorded macro (None if nothing was recorded).'''
+        macro, self.macro = self.macro, None
+        return macro
+
+    def _recordMacroStep(self, name:str, *args):
+        if self.macro is not None:
+            self.macro.steps.append([name, *args])
+
+    def replayMacro(self, macro:'Macro'):
+        '''Replays macro as one action, so one undo reverts all its edits.'''
+        replayAction = MacroReplayAction(self, macro)
+        replayAction.execute_do()
+        UndoManager().push(replayAction)
+
+    def setSelectionAnchor(self):
+        '''Selection will start at current cursor location (shift pressed).'''
+        self._recordMacroStep('setSelectionAnchor')
+        self._performSetSelectionAnchor()
+    def _performSetSelectionAnchor(self):
+        self.clearSelectionAnchor()
+        self.selectionAnchor = self.addMark(self.cursorLocation)
+    def clearSelectionAnchor(self):
+        '''Shift released -> anchor is forgotten, selection stays.'''
+        if self.selectionAnchor is not None:
+            self.removeMark(self.selectionAnchor)
+            self.selectionAnchor = None
+
+    def extendSelection(self):
+        '''Selects text between anchor and cursor (cursor moved with shift pressed).'''
+        self._recordMacroStep('extendSelection')
+        self._performExtendSelection()
+        self.notifyTextObservers()
+    def _performExtendSelection(self):
+        anchor = self.selectionAnchor.location if self.selectionAnchor is not None else self.cursorLocation
+        self.selectionRange = LocationRange(anchor, self.cursorLocation)
+
+    def collapseSelection(self):
+        '''Cancels selection (cursor moved without shift).'''
+        self._recordMacroStep('collapseSelection')
+        self._performCollapseSelection()
+        self.notifyTextObservers()
+    def _performCollapseSelection(self):
+        self.selectionRange = LocationRange(self.cursorLocation, self.cursorLocation)
+
+    def selectAll(self):
+        self._recordMacroStep('selectAll')
+        self._performSelectAll()
+        self.notifyTextObservers()
+    def _performSelectAll(self):
+        self.selectionRange = LocationRange(Location(0, 0), Location(len(self.lines) - 1, len(self.lines[-1])))
+
     def moveCursorLeft(self):
         '''Tries to move cursor to the left.'''
+        self._recordMacroStep('moveCursorLeft')
+        moved = self._performMoveCursorLeft()
+        if moved:
+            self.notifyCursorObservers()
+        return moved
+
+    def _performMoveCursorLeft(self):
         if self.cursorLocation.column > 0:
             '''If cursor is somewhere in the middle or right of the row -> move it one space left'''
             new_location = Location(self.cursorLocation.row, self.cursorLocation.column - 1)
             self.cursorLocation = new_location
-            self.notifyCursorObservers()
             return True
         # If we didn't fulfilled upper condition -> cursor was at the start of the row (column = 0)
         elif self.cursorLocation.row > 0:
-            '''If it isn't the first row -> move it one row upwards and place it at the rightmost location'''
-            new_location = Location(self.cursorLocation.row - 1, len(self.lines[self.cursorLocation.row - 1]))
+            '''If it isn't the first row -> move it one row upwards (over folded rows) and place it at the rightmost location'''
+            rowAbove = self._rowAbove(self.cursorLocation.row)
+            new_location = Location(rowAbove, len(self.lines[rowAbove]))
             self.cursorLocation = new_location
-            self.notifyCursorObservers()
             return True
         '''Else -> the cursor was at index (0,0) and we leave it there'''
         return False
 
     def moveCursorRight(self):
         '''Tries to move cursor to the right.'''
+        self._recordMacroStep('moveCursorRight')
+        moved = self._performMoveCursorRight()
+        if moved:
+            self.notifyCursorObservers()
+        return moved
+
+    def _performMoveCursorRight(self):
         if self.cursorLocation.column < len(self.lines[self.cursorLocation.row]):
             '''If the cursor is not at the rightmost place in a row -> move it one space to the right.'''
             new_location = Location(self.cursorLocation.row, self.cursorLocation.column + 1)
             self.cursorLocation = new_location
-            self.notifyCursorObservers()
             return True
         # If we didn't fulfilled upper condition -> cursor was at the end of the row
-        elif self.cursorLocation.row < len(self.lines)-1:
-            '''if it wasn't the last row -> move it one row down at place it at the leftmost location'''
-            new_location = Location(self.cursorLocation.row + 1, 0)
+        elif self._rowBelow(self.cursorLocation.row) is not None:
+            '''if it wasn't the last visible row -> move it one row down (over folded rows) at place it at the leftmost location'''
+            new_location = Location(self._rowBelow(self.cursorLocation.row), 0)
             self.cursorLocation = new_location
-            self.notifyCursorObservers()
             return True
         return False
     
     def moveCursorUp(self):
         '''Tries to move cursor upwards.'''
+        self._recordMacroStep('moveCursorUp')
+        moved = self._performMoveCursorUp()
+        if moved:
+            self.notifyCursorObservers()
+        return moved
+
+    def _performMoveCursorUp(self):
         if self.cursorLocation.row > 0:
-            '''Move cursor one row uppwards'''
-            newRowLocation = self.cursorLocation.row - 1
+            '''Move cursor one row uppwards (over folded rows)'''
+            newRowLocation = self._rowAbove(self.cursorLocation.row)
             newColumnLocation = self.cursorLocation.column
             if len(self.lines[newRowLocation]) < self.cursorLocation.column:
                 '''If upper row is shorter than the initial position of a cursor in the starting row -> cursor should be placed at the end of row'''
                 newColumnLocation = len(self.lines[newRowLocation])
             new_location = Location(newRowLocation,newColumnLocation)
             self.cursorLocation = new_location
-            self.notifyCursorObservers()
             return True
         # if upper condition wasn't met -> we were in a first row
         elif self.cursorLocation.column > 0:
             '''Move cursor at the start of the line.'''
             new_location = Location(self.cursorLocation.row, 0)
             self.cursorLocation = new_location
-            self.notifyCursorObservers()
             return True
         '''else -> the cursor was at index (0,0) and we leave it there'''
         return False
 
     def moveCursorDown(self):
         '''Tries to move cursor downwards.'''
-        if self.cursorLocation.row < len(self.lines)-1:
-            '''Move cursor one row downwards.'''
-            newRowLocation = self.cursorLocation.row + 1
+        self._recordMacroStep('moveCursorDown')
+        moved = self._performMoveCursorDown()
+        if moved:
+            self.notifyCursorObservers()
+        return moved
+
+    def _performMoveCursorDown(self):
+        if self._rowBelow(self.cursorLocation.row) is not None:
+            '''Move cursor one row downwards (over folded rows).'''
+            newRowLocation = self._rowBelow(self.cursorLocation.row)
             newColumnLocation = self.cursorLocation.column
             if len(self.lines[newRowLocation]) < self.cursorLocation.column:
                 '''If bottom row is shorter than the initial position of a cursor in the starting row -> cursor should be placed at the end of row'''
                 newColumnLocation = len(self.lines[newRowLocation])
             new_location = Location(newRowLocation, newColumnLocation)
             self.cursorLocation = new_location
-            self.notifyCursorObservers()
             return True
-        # if upper condition wasn't met -> we were initially in the last row
+        # if upper condition wasn't met -> we were initially in the last visible row
         elif self.cursorLocation.column < len(self.lines[self.cursorLocation.row]):
             '''Move cursor at the end of line.'''
             new_location = Location(self.cursorLocation.row, len(self.lines[self.cursorLocation.row]))
             self.cursorLocation = new_location
-            self.notifyCursorObservers()
             return True
         '''else -> the cursor was at the last end of text and we leave it there'''
         return False
@@ -141,6 +371,7 @@ class TextEditorModel:
         Deletes char before cursor (left from cursor) and moves cursor one space left. Or deletes "\r" and two rows merge into one.
         Equivalent to backspace button.
         '''
+        self._recordMacroStep('deleteBefore')
         deleteBefore = DeleteBeforeAction(self)
         deleteBefore.execute_do()
         UndoManager().push(deleteBefore)
@@ -166,12 +397,14 @@ class TextEditorModel:
         else:
             '''cursor is at location (0,0) -> nothing to change'''
             return
+        self._recordEdit(EditDelta(self.cursorLocation, Location(row, column), self.cursorLocation))
         
         # self.notifyCursorObservers()
         # self.notifyTextObservers()
     
     def deleteAfter(self):
         '''Deletes char which is one space ahead of cursor. Leaves cursor unchanged.'''
+        self._recordMacroStep('deleteAfter')
         deleteAfter = DeleteAfterAction(self)
         deleteAfter.execute_do()
         UndoManager().push(deleteAfter)
@@ -183,17 +416,21 @@ class TextEditorModel:
         if column < len(self.lines[row]):
             '''Delete one char right from cursor.'''
             self.lines[row] = self.lines[row][:column] + self.lines[row][column+1:]
+            deletedEnd = Location(row, column+1)
         # if not -> cursor is at the end of line
         elif row < len(self.lines)-1:
             '''We are not in the last row. -> concatenate row+1 to row and delete row+1'''
             self.lines[row] += self.lines[row+1]
             self.lines.pop(row+1)
+            deletedEnd = Location(row+1, 0)
         else:
             '''We are at the end of file. -> Nothing to do.'''
             return
+        self._recordEdit(EditDelta(self.cursorLocation, deletedEnd, self.cursorLocation))
 
     def deleteRange(self, r:'LocationRange'):
         '''Deletes given range of characters.'''
+        self._recordMacroStep('deleteRange')
         deleteRange = DeleteRangeAction(self)
         deleteRange.execute_do()
         UndoManager().push(deleteRange)
@@ -214,9 +451,10 @@ class TextEditorModel:
             '''Chosen text goes through many rows.'''
             self.lines[start.row:end.row+1] = [self.lines[start.row][:start.column] + self.lines[end.row][end.column:]]
             # line above -> deletes all rows from self.lines starting from start.row until end.row (included) and replaces it with one new line
+        self._recordEdit(EditDelta(start, end, start))
     
         self.cursorLocation = Location(start.row, start.column)
-        self.setSelectionRange(LocationRange(self.cursorLocation, self.cursorLocation))
+        self.selectionRange = LocationRange(self.cursorLocation, self.cursorLocation)   # callers notify observers once after whole action
 
     def insert(self, c: str):
         '''
@@ -225,12 +463,15 @@ class TextEditorModel:
         Input:
             - c: string -> input text
         '''
+        if c:
+            self._recordMacroStep('insert', str(c))
         insertAction = InsertTextAction(self, c)
         insertAction.execute_do()
         UndoManager().push(insertAction)
         UndoManager().notifyUndoManagerObservers()
     
-    def _performInsert(self, c: str):
+    def _performInsert(self, c: 'str | TextView'):
+        '''c can also be TextView (pasted from clipboard) -> its rows are inserted without joining them into one string.'''
         if not c:
             return
         selectedRange = self.getSelectionRange()
@@ -241,18 +482,19 @@ class TextEditorModel:
             '''
             There was selected text. -> firstly we need to remove it and then do insertion.
             '''
-            self.deleteRange(LocationRange(selectionStart, selectionEnd))
+            self._performDeleteRange(LocationRange(selectionStart, selectionEnd))
         
         '''
         Input given string at the place of cursor and move cursore.
         '''
         cursor = self.cursorLocation # if deletion was made, cursor location has changed
         line = self.lines[cursor.row]
-        self.lines[cursor.row] = line[:cursor.column] + c + line[cursor.column:]
-        newRows = self.lines[cursor.row].split('\r')
-        if len(newRows) > 1:
+        insertedRows = c.split('\r') if isinstance(c, str) else c.rowList()
+        if len(insertedRows) > 1:
             '''\r was given in input string -> we need to split that one row into more rows'''
-            self.lines = self.lines[:cursor.row] + [row for row in newRows] + self.lines[cursor.row+1:]
+            newRows = [line[:cursor.column] + insertedRows[0]] + insertedRows[1:-1] + [insertedRows[-1] + line[cursor.column:]]
+            self.lines[cursor.row:cursor.row+1] = newRows
+            insertedEnd = Location(cursor.row + len(insertedRows) - 1, len(insertedRows[-1]))
             if len(c) > 1:
                 '''We didn't input only enter but the whole sentence, with new rows. -> wa want the cursor at the last input word'''
                 lastLine = newRows[-1]
@@ -262,12 +504,31 @@ class TextEditorModel:
                 self.cursorLocation = Location(cursor.row+len(newRows)-1,0) # placing cursor at the start of last row from newRows
         else:
             '''
-            line is already changed. -> We just need to move cursor.
             This section executes if we don't give multiple rows as input. -> we want cursor to move in the same row at the last inputed word.
             '''
-            self.cursorLocation = Location(cursor.row, cursor.column + len(c))
+            self.lines[cursor.row] = line[:cursor.column] + insertedRows[0] + line[cursor.column:]
+            insertedEnd = Location(cursor.row, cursor.column + len(insertedRows[0]))
+            self.cursorLocation = insertedEnd
+        self._recordEdit(EditDelta(cursor, cursor, insertedEnd))
     
     
+    def _performReplace(self, start:'Location', end:'Location', text:str):
+        '''
+        Replaces text between start and end with given text (used for edits coming from other editors).
+        Cursor and selection stay at the same text, as marks do.
+        '''
+        rows = text.split('\r')
+        suffix = self.lines[end.row][end.column:]
+        newEnd = Location(start.row + len(rows) - 1, len(rows[-1]) + (start.column if len(rows) == 1 else 0))
+        rows[0] = self.lines[start.row][:start.column] + rows[0]
+        rows[-1] += suffix
+        self.lines[start.row:end.row+1] = rows
+        delta = EditDelta(start, end, newEnd)
+        self._recordEdit(delta)
+        self.cursorLocation = delta.shiftLocation(self.cursorLocation)
+        self.selectionRange = LocationRange(delta.shiftLocation(self.selectionRange.startingCoordinate),
+                                            delta.shiftLocation(self.selectionRange.endingCoordinate))
+
     def getSelectionRange(self) -> 'LocationRange':
         '''Returns Location Range that are included in current selected area.'''
         return self.selectionRange
@@ -277,42 +538,37 @@ class TextEditorModel:
         self.selectionRange = range
         self.notifyTextObservers()
     
-    def getSelectionRangeText(self):
-        '''Returns string of selected text.'''
-        selectedRange = self.getSelectionRange()
-        start, end = selectedRange.startingCoordinate, selectedRange.endingCoordinate
+    def getSelectionSize(self) -> tuple[int, int]:
+        '''Returns number of selected characters and words (without building selected text).'''
+        return self.statistics.rangeSize(self.lines, self.getSelectionRange())
 
-        # normalize
-        if start > end:
-            start, end = end, start
+    def getSelectionView(self) -> 'TextView':
+        '''Returns lazy view of selected text. Characters are not copied, only one reference per selected row (O(rows)).'''
+        return TextView(self.lines, self.getSelectionRange(), self.getSelectionSize()[0])
 
-        if start == end:
-            return ''
-        
-        if start.row == end.row:
-            return self.lines[start.row][start.column:end.column]
-        
-        '''selected text is in more rows'''
-        listRows = []
-        for rowInd in range(start.row, end.row+1):
-            if rowInd == start.row:
-                '''select text from column index till the end of row'''
-                listRows.append(self.lines[rowInd][start.column:])
-            elif rowInd == end.row:
-                listRows.append(self.lines[rowInd][:end.column])
-            else:
-                '''for all rows in between start row and end row -> takes all row'''
-                listRows.append(self.lines[rowInd])
-        
-        return f"{'\r'.join(listRows)}"
+    def getSelectionRangeText(self):
+        '''Returns string of selected text.'''
+        return str(self.getSelectionView())
 
 @total_ordering
 class Location:
-    '''Class describing coordinates'''
+    '''
+    Class describing coordinates.
+    Locations are immutable, so they can be shared freely (cursor, selection, actions, marks...).
+    '''
+    __slots__ = ('row', 'column')
+
     def __init__(self, row, column):
-        self.row = row
-        self.column = column
-    
+        object.__setattr__(self, 'row', row)
+        object.__setattr__(self, 'column', column)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Location is immutable")
+
+    def __reduce__(self):
+        '''pickle and deepcopy would set slots through __setattr__ -> they create location with constructor instead'''
+        return (Location, (self.row, self.column))
+
     def __eq__(self, other):
         '''Used to compare if two locations are equall'''
         if not isinstance(other, Location):
@@ -325,13 +581,686 @@ class Location:
         # checking firstly by row and then column
         return (self.row, self.column) < (other.row, other.column)
 
+    def __hash__(self):
+        return hash((self.row, self.column))
+
+    def __repr__(self):
+        return f"Location({self.row}, {self.column})"
+
 
 class LocationRange:
     '''Class describing coordinates range'''
+    __slots__ = ('startingCoordinate', 'endingCoordinate')
+
     def __init__(self, startingCoordinate:Location, endingCoordinate:Location):
         self.startingCoordinate = startingCoordinate
         self.endingCoordinate = endingCoordinate
 
+    def __repr__(self):
+        return f"LocationRange({self.startingCoordinate!r}, {self.endingCoordinate!r})"
+
+
+class EditDelta:
+    '''
+    Describes one change of text: text between start and oldEnd was replaced, and the replacement ends at newEnd.
+    Insertion has start == oldEnd, deletion has start == newEnd.
+    Character offset of start and number of removed characters are filled in by TextEditorModel._recordEdit().
+    '''
+    __slots__ = ('start', 'oldEnd', 'newEnd', 'startOffset', 'removedLength')
+
+    def __init__(self, start:Location, oldEnd:Location, newEnd:Location):
+        self.start = start
+        self.oldEnd = oldEnd
+        self.newEnd = newEnd
+        self.startOffset = None
+        self.removedLength = None
+
+    def inverted(self) -> 'EditDelta':
+        '''Returns delta that reverts this one (used by undo).'''
+        return EditDelta(self.start, self.newEnd, self.oldEnd)
+
+    def shiftLocation(self, location:Location) -> Location:
+        '''Returns where given location is after this edit (same rules as MarkTree.shift()).'''
+        if location <= self.start:
+            return location
+        if location < self.oldEnd:
+            return self.start
+        if location.row == self.oldEnd.row:
+            return Location(self.newEnd.row, self.newEnd.column + location.column - self.oldEnd.column)
+        return Location(location.row + self.newEnd.row - self.oldEnd.row, location.column)
+
+    def __repr__(self):
+        return f"EditDelta({self.start!r}, {self.oldEnd!r}, {self.newEnd!r})"
+
+
+class Mark:
+    '''
+    Position in text which follows edits (bookmark, anchor, search hit...).
+    Marks are created with TextEditorModel.addMark() and stay valid until removed.
+    '''
+    __slots__ = ('_node',)
+
+    def __init__(self, node:'_MarkNode'):
+        self._node = node
+
+    @property
+    def location(self) -> Location:
+        '''Current location of mark, after all edits made so far.'''
+        node = self._node
+        if node is None:
+            return None
+        # pending shifts are stored lazily on ancestors -> push them down along the path from root
+        path = []
+        while node is not None:
+            path.append(node)
+            node = node.parent
+        for n in reversed(path):
+            n.pushDown()
+        return self._node.location
+
+    def __repr__(self):
+        return f"Mark({self.location!r})"
+
+
+class _MarkNode:
+    '''Node of MarkTree (treap ordered by location, random priority as heap key).'''
+    __slots__ = ('mark', 'location', 'priority', 'left', 'right', 'parent', 'collapseTo', 'rowShift', 'columnShift')
+
+    def __init__(self, location:Location):
+        self.mark = Mark(self)
+        self.location = location
+        self.priority = random.random()
+        self.left = None
+        self.right = None
+        self.parent = None
+        # lazy tag for children: first move to collapseTo (if given), then shift by (rowShift, columnShift)
+        self.collapseTo = None
+        self.rowShift = 0
+        self.columnShift = 0
+
+    def applyTag(self, collapseTo:Location, rowShift:int, columnShift:int):
+        '''Moves this node and remembers the move for its children.'''
+        location = collapseTo if collapseTo is not None else self.location
+        self.location = Location(location.row + rowShift, location.column + columnShift)
+        if collapseTo is not None:
+            self.collapseTo = collapseTo
+            self.rowShift, self.columnShift = rowShift, columnShift
+        else:
+            self.rowShift += rowShift
+            self.columnShift += columnShift
+
+    def pushDown(self):
+        '''Passes pending tag to children.'''
+        if self.collapseTo is None and self.rowShift == 0 and self.columnShift == 0:
+            return
+        for child in (self.left, self.right):
+            if child is not None:
+                child.applyTag(self.collapseTo, self.rowShift, self.columnShift)
+        self.collapseTo = None
+        self.rowShift = self.columnShift = 0
+
+
+class MarkTree:
+    '''
+    Registry of marks ordered by location.
+    Every edit shifts all marks in O(log n): the tree is split into parts (before edit, inside deleted text,
+    rest of the last edited row, following rows) and each part gets one lazy tag.
+    Marks exactly at the place of insertion stay in front of inserted text.
+    '''
+    def __init__(self):
+        self.root = None
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        '''Goes through all marks ordered by location.'''
+        stack = []
+        node = self.root
+        while stack or node is not None:
+            while node is not None:
+                node.pushDown()
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield node.mark
+            node = node.right
+
+    def add(self, location:Location) -> Mark:
+        '''Creates mark at given location.'''
+        node = _MarkNode(location)
+        left, right = self._split(self.root, location, True)
+        self.root = self._merge(self._merge(left, node), right)
+        self.root.parent = None
+        self.size += 1
+        return node.mark
+
+    def remove(self, mark:Mark):
+        '''Removes given mark. Its location becomes None.'''
+        node = mark._node
+        if node is None:
+            return
+        mark.location   # pushes pending tags down to this node
+        node.pushDown()
+        replacement = self._merge(node.left, node.right)
+        parent = node.parent
+        if replacement is not None:
+            replacement.parent = parent
+        if parent is None:
+            self.root = replacement
+        elif parent.left is node:
+            parent.left = replacement
+        else:
+            parent.right = replacement
+        mark._node = None
+        self.size -= 1
+
+    def marksInRange(self, r:LocationRange):
+        '''Returns marks whose location lies in given range (both ends included), ordered by location.'''
+        start, end = r.startingCoordinate, r.endingCoordinate
+        if start > end:
+            start, end = end, start
+        left, rest = self._split(self.root, start, False)
+        middle, right = self._split(rest, end, True)
+        marks = []
+        stack = []
+        node = middle
+        while stack or node is not None:
+            while node is not None:
+                node.pushDown()
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            marks.append(node.mark)
+            node = node.right
+        self.root = self._merge(self._merge(left, middle), right)
+        if self.root is not None:
+            self.root.parent = None
+        return marks
+
+    def shift(self, delta:EditDelta):
+        '''Moves all marks so they point to the same text after given edit.'''
+        start, oldEnd, newEnd = delta.start, delta.oldEnd, delta.newEnd
+        if self.root is None or (start == oldEnd == newEnd):
+            return
+        before, rest = self._split(self.root, start, True)
+        deleted, rest = self._split(rest, oldEnd, False)
+        lastRow, after = self._split(rest, Location(oldEnd.row + 1, 0), False)
+        if deleted is not None:
+            deleted.applyTag(start, 0, 0)
+        if lastRow is not None:
+            lastRow.applyTag(None, newEnd.row - oldEnd.row, newEnd.column - oldEnd.column)
+        if after is not None:
+            after.applyTag(None, newEnd.row - oldEnd.row, 0)
+        self.root = self._merge(self._merge(before, deleted), self._merge(lastRow, after))
+        if self.root is not None:
+            self.root.parent = None
+
+    def _split(self, node:_MarkNode, location:Location, inclusive:bool):
+        '''
+        Splits subtree into two trees: nodes before location and the rest.
+        If inclusive is True, nodes equal to location go into the first tree.
+        '''
+        if node is None:
+            return None, None
+        node.pushDown()
+        if node.location < location or (inclusive and node.location == location):
+            left, right = self._split(node.right, location, inclusive)
+            node.right = left
+            if left is not None:
+                left.parent = node
+            if right is not None:
+                right.parent = None
+            return node, right
+        left, right = self._split(node.left, location, inclusive)
+        node.left = right
+        if right is not None:
+            right.parent = node
+        if left is not None:
+            left.parent = None
+        return left, node
+
+    def _merge(self, left:_MarkNode, right:_MarkNode):
+        '''Merges two trees, all nodes of left tree have to be before nodes of right tree.'''
+        if left is None:
+            return right
+        if right is None:
+            return left
+        if left.priority > right.priority:
+            left.pushDown()
+            left.right = self._merge(left.right, right)
+            left.right.parent = left
+            return left
+        right.pushDown()
+        right.left = self._merge(left, right.left)
+        right.left.parent = right
+        return right
+
+class _FoldNode:
+    '''Node of FoldTree. Fold hides rows startRow+1 until endRow (included), row startRow stays visible as header.'''
+    __slots__ = ('startRow', 'endRow', 'priority', 'left', 'right', 'rowShift', 'hiddenRows')
+
+    def __init__(self, startRow:int, endRow:int):
+        self.startRow = startRow
+        self.endRow = endRow
+        self.priority = random.random()
+        self.left = None
+        self.right = None
+        self.rowShift = 0       # lazy shift for children
+        self.hiddenRows = endRow - startRow     # hidden rows in whole subtree
+
+    def applyShift(self, rowShift:int):
+        self.startRow += rowShift
+        self.endRow += rowShift
+        self.rowShift += rowShift
+
+    def pushDown(self):
+        if self.rowShift:
+            for child in (self.left, self.right):
+                if child is not None:
+                    child.applyShift(self.rowShift)
+            self.rowShift = 0
+
+    def update(self):
+        self.hiddenRows = self.endRow - self.startRow
+        for child in (self.left, self.right):
+            if child is not None:
+                self.hiddenRows += child.hiddenRows
+
+
+class FoldTree:
+    '''
+    Interval tree of folded (hidden) regions. Folds do not overlap and are ordered by rows (treap with random priorities).
+    Every node knows how many rows are hidden in its subtree, so mapping between logical rows (rows of document)
+    and visible rows (rows on screen) takes O(log n). Edits shift folds with lazy tags, same as MarkTree.
+    '''
+    def __init__(self):
+        self.root = None
+
+    def __iter__(self):
+        '''Goes through folds as tuples (startRow, endRow), ordered by rows.'''
+        return iter(self._nodes(self.root))
+
+    def __len__(self):
+        return len(self._nodes(self.root))
+
+    def hiddenRowCount(self) -> int:
+        return self.root.hiddenRows if self.root is not None else 0
+
+    def foldContaining(self, row:int) -> tuple[int, int]:
+        '''Returns fold (startRow, endRow) which hides given row, or None if row is visible.'''
+        node = self.root
+        while node is not None:
+            node.pushDown()
+            if row <= node.startRow:
+                node = node.left
+            elif row > node.endRow:
+                node = node.right
+            else:
+                return node.startRow, node.endRow
+        return None
+
+    def foldAt(self, row:int) -> tuple[int, int]:
+        '''Returns fold whose header is given row, or None.'''
+        node = self.root
+        while node is not None:
+            node.pushDown()
+            if row == node.startRow:
+                return node.startRow, node.endRow
+            node = node.left if row < node.startRow else node.right
+        return None
+
+    def logicalToVisible(self, row:int) -> int:
+        '''Returns index of row on screen. Hidden row gets index of header of its fold.'''
+        fold = self.foldContaining(row)
+        if fold is not None:
+            row = fold[0]
+        hidden = 0
+        node = self.root
+        while node is not None:
+            node.pushDown()
+            if node.startRow < row:
+                hidden += node.endRow - node.startRow + (node.left.hiddenRows if node.left is not None else 0)
+                node = node.right
+            else:
+                node = node.left
+        return row - hidden
+
+    def visibleToLogical(self, visibleRow:int) -> int:
+        '''Returns row of document which is shown as given visible row.'''
+        hidden = 0
+        node = self.root
+        while node is not None:
+            node.pushDown()
+            leftHidden = node.left.hiddenRows if node.left is not None else 0
+            if visibleRow <= node.startRow - hidden - leftHidden:
+                node = node.left
+            else:
+                hidden += leftHidden + node.endRow - node.startRow
+                node = node.right
+        return visibleRow + hidden
+
+    def add(self, startRow:int, endRow:int) -> bool:
+        '''
+        Folds rows startRow+1 until endRow. Folds with header inside new fold are merged into it.
+        Returns False if nothing can be folded (empty range or header is already hidden).
+        '''
+        if endRow <= startRow or self.foldContaining(startRow) is not None:
+            return False
+        before, rest = self._split(self.root, lambda node: node.startRow < startRow)
+        merged, after = self._split(rest, lambda node: node.startRow <= endRow)
+        for mergedStart, mergedEnd in self._nodes(merged):
+            endRow = max(endRow, mergedEnd)
+        self.root = self._merge(self._merge(before, _FoldNode(startRow, endRow)), after)
+        return True
+
+    def remove(self, startRow:int) -> bool:
+        '''Unfolds fold with given header. Returns False if there is no such fold.'''
+        before, rest = self._split(self.root, lambda node: node.startRow < startRow)
+        removed, after = self._split(rest, lambda node: node.startRow == startRow)
+        self.root = self._merge(before, after)
+        return removed is not None
+
+    def clear(self):
+        self.root = None
+
+    def shift(self, delta:EditDelta):
+        '''
+        Moves folds after edit. Folds after edited rows are shifted, folds which contain whole edit in hidden rows
+        grow or shrink. Edit which ends in header row keeps fold, header becomes the row where edit ends now
+        (Enter in header moves fold under the new row). Every other fold touched by edit is unfolded.
+        '''
+        startRow, oldEndRow = delta.start.row, delta.oldEnd.row
+        rowShift = delta.newEnd.row - oldEndRow
+        if self.root is None or (rowShift == 0 and startRow == oldEndRow):
+            '''edit inside one row doesn't change any fold'''
+            return
+        touched, after = self._split(self.root, lambda node: node.startRow <= oldEndRow)
+        before, touched = self._split(touched, lambda node: node.endRow < startRow)
+        if after is not None:
+            after.applyShift(rowShift)
+        kept = None
+        for foldStart, foldEnd in self._nodes(touched):
+            if foldStart < startRow and oldEndRow <= foldEnd:
+                foldEnd += rowShift
+            elif foldStart == oldEndRow:
+                # hidden rows follow the rest of header, which is now in row delta.newEnd.row
+                foldStart, foldEnd = delta.newEnd.row, foldEnd + rowShift
+            else:
+                continue
+            if foldEnd > foldStart:
+                kept = self._merge(kept, _FoldNode(foldStart, foldEnd))
+        self.root = self._merge(self._merge(before, kept), after)
+
+    def _nodes(self, node:_FoldNode) -> list[tuple[int, int]]:
+        '''Returns folds of subtree ordered by rows.'''
+        result = []
+        stack = []
+        while stack or node is not None:
+            while node is not None:
+                node.pushDown()
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            result.append((node.startRow, node.endRow))
+            node = node.right
+        return result
+
+    def _split(self, node:_FoldNode, goesLeft):
+        '''Splits subtree into folds for which goesLeft(node) is True and the rest (goesLeft has to be monotone).'''
+        if node is None:
+            return None, None
+        node.pushDown()
+        if goesLeft(node):
+            left, right = self._split(node.right, goesLeft)
+            node.right = left
+            node.update()
+            return node, right
+        left, right = self._split(node.left, goesLeft)
+        node.left = right
+        node.update()
+        return left, node
+
+    def _merge(self, left:_FoldNode, right:_FoldNode):
+        '''Merges two trees, all folds of left tree have to be before folds of right tree.'''
+        if left is None:
+            return right
+        if right is None:
+            return left
+        if left.priority > right.priority:
+            left.pushDown()
+            left.right = self._merge(left.right, right)
+            left.update()
+            return left
+        right.pushDown()
+        right.left = self._merge(left, right.left)
+        right.update()
+        return right
+
+class DocumentStatistics:
+    '''
+    Counts of lines, characters and words of document.
+    Length and word count of every row are stored in blocks of about STATISTICS_BLOCK_SIZE rows. Sums of blocks are kept
+    in Fenwick trees (rows, characters with line breaks, words), so block of any row or offset is found in O(log blocks)
+    and edit updates only rows it touched. Blocks are split or merged only when they grow or shrink a lot.
+    Line breaks are counted as characters (same as in getSelectionRangeText()).
+    '''
+    def __init__(self, lines:list[str]):
+        self.lengthBlocks: list[list[int]] = []    # lengths of rows, split into blocks
+        self.wordBlocks: list[list[int]] = []      # word counts of rows, split into blocks
+        self.rowTree: list[int] = [0]          # Fenwick trees over blocks (index 0 is unused)
+        self.characterTree: list[int] = [0]    # characters of block including line break after every row
+        self.wordTree: list[int] = [0]
+        self.lineCount = 0
+        self.lengthCount = 0    # characters without line breaks
+        self.wordCount = 0
+        self._replaceRows(0, 0, [len(line) for line in lines], [len(line.split()) for line in lines])
+
+    @property
+    def characterCount(self) -> int:
+        return self.lengthCount + self.lineCount - 1
+
+    def update(self, lines:list[str], delta:EditDelta):
+        '''Rows from delta.start until delta.oldEnd were replaced by rows until delta.newEnd (lines are already changed).'''
+        start, oldEnd, newEnd = delta.start, delta.oldEnd, delta.newEnd
+        newRows = lines[start.row:newEnd.row+1]
+        self._replaceRows(start.row, oldEnd.row - start.row + 1, [len(line) for line in newRows], [len(line.split()) for line in newRows])
+
+    def charactersBefore(self, location:Location) -> int:
+        '''Returns offset of location from start of document.'''
+        block, local = self._findBlock(self.rowTree, location.row)
+        return self._prefix(self.characterTree, block) + sum(self.lengthBlocks[block][:local]) + local + location.column
+
+    def locationAt(self, offset:int) -> Location:
+        '''Returns location of given offset from start of document (offsets after end give end of document).'''
+        block, offset = self._findBlock(self.characterTree, offset)
+        row = self._prefix(self.rowTree, block)
+        for length in self.lengthBlocks[block]:
+            if offset <= length:
+                return Location(row, offset)
+            offset -= length + 1
+            row += 1
+        return Location(self.lineCount - 1, self.lengthBlocks[-1][-1])
+
+    def rangeSize(self, lines:list[str], r:LocationRange) -> tuple[int, int]:
+        '''Returns number of characters and words in given range. Only first and last row of range are read.'''
+        start, end = r.startingCoordinate, r.endingCoordinate
+        if start > end:
+            start, end = end, start
+        characters = self.charactersBefore(end) - self.charactersBefore(start)
+        if start.row == end.row:
+            return characters, len(lines[start.row][start.column:end.column].split())
+        words = len(lines[start.row][start.column:].split()) + len(lines[end.row][:end.column].split())
+        words += self._wordsBefore(end.row) - self._wordsBefore(start.row + 1)
+        return characters, words
+
+    def _wordsBefore(self, row:int) -> int:
+        block, local = self._findBlock(self.rowTree, row)
+        return self._prefix(self.wordTree, block) + sum(self.wordBlocks[block][:local])
+
+    def _findBlock(self, tree:list[int], value:int) -> tuple[int, int]:
+        '''
+        Returns (block, rest): the most blocks whose sum in tree is at most value, and what remains of value.
+        Value after the last block gives the last block (rest is then counted from its start).
+        '''
+        position = 0
+        step = 1 << (len(tree) - 1).bit_length()
+        while step:
+            if position + step < len(tree) and tree[position + step] <= value:
+                position += step
+                value -= tree[position]
+            step >>= 1
+        if position == len(tree) - 1:
+            position -= 1
+            value += self._prefix(tree, position + 1) - self._prefix(tree, position)
+        return position, value
+
+    def _prefix(self, tree:list[int], block:int) -> int:
+        '''Sum of blocks before given block.'''
+        total = 0
+        while block > 0:
+            total += tree[block]
+            block -= block & -block
+        return total
+
+    def _add(self, tree:list[int], block:int, value:int):
+        block += 1
+        while block < len(tree):
+            tree[block] += value
+            block += block & -block
+
+    def _rebuildTrees(self):
+        '''Builds Fenwick trees from blocks in O(blocks) (after blocks were split or merged).'''
+        self.rowTree = [0] + [len(block) for block in self.lengthBlocks]
+        self.characterTree = [0] + [sum(block) + len(block) for block in self.lengthBlocks]
+        self.wordTree = [0] + [sum(block) for block in self.wordBlocks]
+        for tree in (self.rowTree, self.characterTree, self.wordTree):
+            for i in range(1, len(tree)):
+                parent = i + (i & -i)
+                if parent < len(tree):
+                    tree[parent] += tree[i]
+
+    def _replaceRows(self, startRow:int, oldCount:int, newLengths:list[int], newWords:list[int]):
+        '''Replaces values of oldCount rows starting from startRow. Only blocks containing those rows are rebuilt.'''
+        if not self.lengthBlocks:
+            self.lengthBlocks, self.wordBlocks = [[]], [[]]
+            self._rebuildTrees()
+        first, local = self._findBlock(self.rowTree, startRow)
+        last = self._findBlock(self.rowTree, startRow + oldCount - 1)[0] if oldCount else first
+
+        lengths = [value for block in self.lengthBlocks[first:last+1] for value in block]
+        words = [value for block in self.wordBlocks[first:last+1] for value in block]
+        removedLengths = lengths[local:local+oldCount]
+        removedWords = words[local:local+oldCount]
+        lengths[local:local+oldCount] = newLengths
+        words[local:local+oldCount] = newWords
+
+        self.lineCount += len(newLengths) - len(removedLengths)
+        self.lengthCount += sum(newLengths) - sum(removedLengths)
+        self.wordCount += sum(newWords) - sum(removedWords)
+
+        count = last - first + 1
+        while len(lengths) < count * STATISTICS_BLOCK_SIZE // 2 and count < len(self.lengthBlocks):
+            '''rows don't fill their blocks -> take rows of neighbouring block too, so blocks don't fragment'''
+            if last + 1 < len(self.lengthBlocks):
+                last += 1
+                lengths += self.lengthBlocks[last]
+                words += self.wordBlocks[last]
+            else:
+                first -= 1
+                lengths = self.lengthBlocks[first] + lengths
+                words = self.wordBlocks[first] + words
+            count += 1
+        if count * STATISTICS_BLOCK_SIZE // 2 <= len(lengths) <= count * STATISTICS_BLOCK_SIZE * 2:
+            # rows still fit into the same number of blocks -> split them evenly, only these blocks change in trees
+            bounds = [len(lengths) * i // count for i in range(count + 1)]
+            for i in range(count):
+                block = first + i
+                oldLengths, oldWords = self.lengthBlocks[block], self.wordBlocks[block]
+                blockLengths, blockWords = lengths[bounds[i]:bounds[i+1]], words[bounds[i]:bounds[i+1]]
+                self._add(self.rowTree, block, len(blockLengths) - len(oldLengths))
+                self._add(self.characterTree, block, sum(blockLengths) + len(blockLengths) - sum(oldLengths) - len(oldLengths))
+                self._add(self.wordTree, block, sum(blockWords) - sum(oldWords))
+                self.lengthBlocks[block], self.wordBlocks[block] = blockLengths, blockWords
+            return
+        # blocks grew or shrank a lot -> split rows into new blocks and build trees again
+        count = max(1, round(len(lengths) / STATISTICS_BLOCK_SIZE))
+        bounds = [len(lengths) * i // count for i in range(count + 1)]
+        self.lengthBlocks[first:last+1] = [lengths[bounds[i]:bounds[i+1]] for i in range(count)]
+        self.wordBlocks[first:last+1] = [words[bounds[i]:bounds[i+1]] for i in range(count)]
+        self._rebuildTrees()
+
+class TextView:
+    '''
+    Lazy view of text between two locations (for example selection).
+    Rows are shared with document (strings are immutable), so creating view copies no characters, only a list with
+    one reference per row -> O(rows) time and memory, which is much less than text itself but not constant.
+    Text is produced only piece by piece -> chunks(), writeTo() and find() never build the whole string.
+    '''
+    __slots__ = ('rows', 'start', 'startColumn', 'endColumn', 'length')
+
+    def __init__(self, lines:list[str], r:LocationRange, length:int):
+        start, end = r.startingCoordinate, r.endingCoordinate
+        if start > end:
+            start, end = end, start
+        self.rows = lines[start.row:end.row+1]      # copies only references to rows
+        self.start = start
+        self.startColumn = start.column
+        self.endColumn = end.column
+        self.length = length    # number of characters, given by DocumentStatistics
+
+    def __len__(self):
+        return self.length
+
+    def __str__(self):
+        return ''.join(self.chunks())
+
+    def rowList(self) -> list[str]:
+        '''Returns rows of view (only first and last row are sliced).'''
+        if len(self.rows) == 1:
+            return [self.rows[0][self.startColumn:self.endColumn]]
+        return [self.rows[0][self.startColumn:]] + self.rows[1:-1] + [self.rows[-1][:self.endColumn]]
+
+    def chunks(self, lineSeparator:str='\r'):
+        '''Returns generator of text pieces (rows and separators).'''
+        if len(self.rows) == 1:
+            yield self.rows[0][self.startColumn:self.endColumn]
+            return
+        yield self.rows[0][self.startColumn:]
+        for row in self.rows[1:-1]:
+            yield lineSeparator
+            yield row
+        yield lineSeparator
+        yield self.rows[-1][:self.endColumn]
+
+    def writeTo(self, f, lineSeparator:str='\r'):
+        '''Writes text of view into opened file (or any object with write method).'''
+        for chunk in self.chunks(lineSeparator):
+            f.write(chunk)
+
+    def find(self, pattern:str) -> Location:
+        '''Returns location (in document) of first occurrence of pattern, or None. Pattern can go through more rows.'''
+        rows = self.rowList()
+        parts = pattern.split('\r')
+        if len(parts) == 1:
+            for i, row in enumerate(rows):
+                column = row.find(pattern)
+                if column != -1:
+                    return self._documentLocation(i, column)
+            return None
+        for i in range(len(rows) - len(parts) + 1):
+            if rows[i].endswith(parts[0]) and rows[i+len(parts)-1].startswith(parts[-1]) \
+                    and all(rows[i+k] == parts[k] for k in range(1, len(parts)-1)):
+                return self._documentLocation(i, len(rows[i]) - len(parts[0]))
+        return None
+
+    def _documentLocation(self, row:int, column:int) -> Location:
+        '''Converts location inside view to location in document.'''
+        if row == 0:
+            column += self.startColumn
+        return Location(self.start.row + row, column)
+
 class CursorObserver:
     '''This is cursor observer interface.'''
     def updateCursorLocation(self, loc:Location):
@@ -342,6 +1271,11 @@ class TextObserver:
     def updateText(self):
         pass
 
+class EditObserver:
+    '''This is edit observer interface. It gets every change of text as EditDelta.'''
+    def updateEdit(self, delta:EditDelta):
+        pass
+
 class EditAction:
     '''Interface that defines which methods action classes have to define.'''
     def execute_do(self):
@@ -359,6 +1293,7 @@ class InsertTextAction(EditAction):
         self.inputText = inputText
         self.initialLinesList = textEditorModel.lines.copy()
         self.initialCursorPosition = textEditorModel.cursorLocation
+        self.editDeltas: list[EditDelta] = []     # deltas made by last execute_do, reverted on undo
         self.selectedRange = textEditorModel.getSelectionRange()
 
     def execute_do(self):
@@ -370,12 +1305,15 @@ class InsertTextAction(EditAction):
         self.initialLinesList = self.textEditorModel.lines.copy()
         self.textEditorModel.cursorLocation = self.initialCursorPosition
         
+        self.textEditorModel._beginEditDeltas()
         self.textEditorModel._performInsert(self.inputText)
+        self.editDeltas = self.textEditorModel._endEditDeltas()
         self.textEditorModel.notifyCursorObservers()
         self.textEditorModel.notifyTextObservers()
 
     def execute_undo(self):
         self.textEditorModel.lines = self.initialLinesList
+        self.textEditorModel._revertEditDeltas(self.editDeltas)
         self.textEditorModel.cursorLocation = self.initialCursorPosition
         self.textEditorModel.notifyCursorObservers()
         self.textEditorModel.notifyTextObservers()
@@ -386,16 +1324,20 @@ class DeleteBeforeAction(EditAction):
         self.textEditorModel = textEditorModel
         self.initialLinesList = textEditorModel.lines.copy()
         self.initialCursorPosition = textEditorModel.cursorLocation
+        self.editDeltas: list[EditDelta] = []     # deltas made by last execute_do, reverted on undo
     
     def execute_do(self):
         self.initialLinesList = self.textEditorModel.lines.copy()
         self.textEditorModel.cursorLocation = self.initialCursorPosition
+        self.textEditorModel._beginEditDeltas()
         self.textEditorModel._performDeleteBefore()
+        self.editDeltas = self.textEditorModel._endEditDeltas()
         self.textEditorModel.notifyCursorObservers()
         self.textEditorModel.notifyTextObservers()
     
     def execute_undo(self):
         self.textEditorModel.lines = self.initialLinesList
+        self.textEditorModel._revertEditDeltas(self.editDeltas)
         self.textEditorModel.cursorLocation = self.initialCursorPosition
         self.textEditorModel.notifyCursorObservers()
         self.textEditorModel.notifyTextObservers()
@@ -405,15 +1347,19 @@ class DeleteAfterAction(EditAction):
         self.textEditorModel = textEditorModel
         self.initialLinesList = textEditorModel.lines.copy()
         self.initialCursorPosition = textEditorModel.cursorLocation
+        self.editDeltas: list[EditDelta] = []     # deltas made by last execute_do, reverted on undo
 
     def execute_do(self):
         self.initialLinesList = self.textEditorModel.lines.copy()
         self.textEditorModel.cursorLocation = self.initialCursorPosition
+        self.textEditorModel._beginEditDeltas()
         self.textEditorModel._performDeleteAfter()
+        self.editDeltas = self.textEditorModel._endEditDeltas()
         self.textEditorModel.notifyTextObservers()
     
     def execute_undo(self):
         self.textEditorModel.lines = self.initialLinesList
+        self.textEditorModel._revertEditDeltas(self.editDeltas)
         self.textEditorModel.cursorLocation = self.initialCursorPosition
         self.textEditorModel.notifyTextObservers()
 
@@ -422,40 +1368,71 @@ class DeleteRangeAction(EditAction):
         self.textEditorModel = textEditorModel
         self.initialLinesList = textEditorModel.lines.copy()
         self.initialCursorPosition = textEditorModel.cursorLocation
+        self.editDeltas: list[EditDelta] = []     # deltas made by last execute_do, reverted on undo
         self.selectedRange = textEditorModel.getSelectionRange()
 
     def execute_do(self):
         self.initialLinesList = self.textEditorModel.lines.copy()
         self.textEditorModel.cursorLocation = self.initialCursorPosition
+        self.textEditorModel._beginEditDeltas()
         self.textEditorModel._performDeleteRange(self.selectedRange)
+        self.editDeltas = self.textEditorModel._endEditDeltas()
         self.textEditorModel.notifyCursorObservers()
         self.textEditorModel.notifyTextObservers()
     
     def execute_undo(self):
         self.textEditorModel.lines = self.initialLinesList
+        self.textEditorModel._revertEditDeltas(self.editDeltas)
         self.textEditorModel.cursorLocation = self.initialCursorPosition
         self.textEditorModel.notifyCursorObservers()
         self.textEditorModel.notifyTextObservers()
 
+class MacroReplayAction(EditAction):
+    '''Replays macro. Lines are saved once before replay and undo restores them.'''
+    def __init__(self, textEditorModel: TextEditorModel, macro: 'Macro'):
+        self.textEditorModel = textEditorModel
+        self.macro = macro
+        self.initialLinesList = textEditorModel.lines.copy()
+        self.initialCursorPosition = textEditorModel.cursorLocation
+        self.selectedRange = textEditorModel.getSelectionRange()
+
+    def execute_do(self):
+        self.initialLinesList = self.textEditorModel.lines.copy()
+        self.textEditorModel.cursorLocation = self.initialCursorPosition
+        self.textEditorModel.selectionRange = self.selectedRange
+        self.macro.replay(self.textEditorModel)
+        self.textEditorModel.notifyCursorObservers()
+        self.textEditorModel.notifyTextObservers()
+
+    def execute_undo(self):
+        self.textEditorModel._restoreLines(self.initialLinesList)
+        self.textEditorModel.cursorLocation = self.initialCursorPosition
+        self.textEditorModel.selectionRange = self.selectedRange
+        self.textEditorModel.notifyCursorObservers()
+        self.textEditorModel.notifyTextObservers()
+
 class ClipboardStack:
     '''Class that provides stack functionality for clipboard operations (cut, paste...)'''
     def __init__(self):
-        self.texts : list[str] = []     # imitates stack -> elements are strings
+        self.texts : list[str | TextView] = []     # imitates stack -> elements are strings or lazy views of copied text
         self.clipboardObservers : list[ClipboardObserver] = []  # list of clipboard observers
 
-    def pushInClipboard(self, text: str):
+    def pushInClipboard(self, text: 'str | TextView'):
         '''Pushes text at the top of the stack.'''
         self.texts.append(text)
+        self.notifyClipboardObservers()
 
-    def popFromClipboard(self) -> str:
+    def popFromClipboard(self) -> 'str | TextView':
         '''
         Pops and returns last element from the clipboard (if it is not empty).
         If it's empty method does not do anything.
         '''
         if self.isTextInClipboardPresent():
-            return self.texts.pop()
+            text = self.texts.pop()
+            self.notifyClipboardObservers()
+            return text
     
-    def peekAtClipboard(self) -> str:
+    def peekAtClipboard(self) -> 'str | TextView':
         '''
         Says last element in clipboard, BUT DOES NOT change clipboard.
         If clipboard is not empty, if it is, method does nothing.
@@ -466,6 +1443,7 @@ class ClipboardStack:
     def clearClipboard(self):
         '''Deletes everything from clipboard.'''
         self.texts.clear()
+        self.notifyClipboardObservers()
         
     def isTextInClipboardPresent(self) -> bool:
         return bool(self.texts)
@@ -489,6 +1467,66 @@ class ClipboardObserver:
     def updateClipboard(self):
         pass
 
+class Macro:
+    '''
+    Recorded sequence of edits and cursor moves. Every step is a list [name, *arguments], so macro can be saved as JSON.
+    Only the first step (cursor location) is absolute. Selections are rebuilt from anchor and cursor moves, so macro
+    edits the same text relative to cursor in any document. Undo and redo are not recorded.
+    '''
+    def __init__(self, steps:list[list] = None):
+        self.steps: list[list] = steps if steps is not None else []
+
+    def toJson(self) -> str:
+        return json.dumps({'steps': self.steps})
+
+    @classmethod
+    def fromJson(cls, text:str) -> 'Macro':
+        return cls(json.loads(text)['steps'])
+
+    def save(self, path:str):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.toJson())
+
+    @classmethod
+    def load(cls, path:str) -> 'Macro':
+        with open(path, encoding='utf-8') as f:
+            return cls.fromJson(f.read())
+
+    def replay(self, textEditorModel:TextEditorModel):
+        '''
+        Applies steps to model. Steps are executed by _perform* methods, so nothing is pushed to UndoManager, nothing is
+        recorded and observers are not notified -> caller notifies them once after replay if needed
+        (TextEditorModel.replayMacro() does it as one undoable action).
+        Location of the first step is moved to the nearest existing location if document is shorter.
+        '''
+        model = textEditorModel
+        anchor, model.selectionAnchor = model.selectionAnchor, None     # macro starts its own selections
+        try:
+            for name, *args in self.steps:
+                if name == 'insert':
+                    model._performInsert(args[0])
+                elif name == 'deleteRange':
+                    model._performDeleteRange(model.getSelectionRange())
+                elif name == 'deleteBefore':
+                    model._performDeleteBefore()
+                elif name == 'deleteAfter':
+                    model._performDeleteAfter()
+                elif name == 'moveCursorTo':
+                    model.cursorLocation = self._clamp(model, *args)
+                elif name in ('moveCursorLeft', 'moveCursorRight', 'moveCursorUp', 'moveCursorDown',
+                              'setSelectionAnchor', 'extendSelection', 'collapseSelection', 'selectAll'):
+                    getattr(model, '_perform' + name[0].upper() + name[1:])()
+                else:
+                    raise ValueError(f"Unknown macro step: {name}")
+        finally:
+            model.clearSelectionAnchor()
+            model.selectionAnchor = anchor
+
+    @staticmethod
+    def _clamp(model:TextEditorModel, row:int, column:int) -> Location:
+        row = max(0, min(row, len(model.lines) - 1))
+        return Location(row, max(0, min(column, len(model.lines[row]))))
+
 class UndoManager:
     '''
     Class that specifies undo and redo actions.
@@ -528,6 +1566,12 @@ class UndoManager:
         self.undoStack.append(c)
         self.notifyUndoManagerObservers()
 
+    def clear(self):
+        '''Forgets all actions (their saved states no longer match text, for example after edits from other editor).'''
+        self.undoStack.clear()
+        self.redoStack.clear()
+        self.notifyUndoManagerObservers()
+
     def attachUndoManagerObserver(self, o: 'UndoManagerObserver'):
         self.observers.append(o)
     
@@ -544,7 +1588,376 @@ class UndoManagerObserver:
     def updateUndoRedo(self, undoAvailable: bool, redoAvailable: bool):
         pass
 
-class TextEditor(Canvas, CursorObserver, TextObserver, ClipboardObserver):
+class DiffHunk:
+    '''
+    One changed region of compared documents.
+    Both ranges are line ranges: from Location(startRow, 0) until Location(endRow, 0), end row is excluded.
+    Empty oldRange means that lines were added, empty newRange means that lines were deleted.
+    '''
+    __slots__ = ('oldRange', 'newRange')
+
+    def __init__(self, oldRange:LocationRange, newRange:LocationRange):
+        self.oldRange = oldRange
+        self.newRange = newRange
+
+    def isAdded(self) -> bool:
+        return self.oldRange.startingCoordinate == self.oldRange.endingCoordinate
+
+    def isDeleted(self) -> bool:
+        return self.newRange.startingCoordinate == self.newRange.endingCoordinate
+
+    def __repr__(self):
+        return f"DiffHunk({self.oldRange!r}, {self.newRange!r})"
+
+
+def readFileLines(path:str) -> list[str]:
+    '''
+    Reads file row by row (whole text is never built). Ending line break gives empty last row, same as split(),
+    so document saved with final line break matches the file exactly.
+    '''
+    return readFileRows(path)[0]
+
+def readFileRows(path:str) -> tuple[list[str], str]:
+    '''Same as readFileLines(), also returns line separator of file ('\r\n', '\n' or '\r', first one found, default '\n').'''
+    lines = []
+    separator = None
+    endsWithBreak = True
+    with open(path, encoding='utf-8', newline='') as f:     # newline='' -> line breaks are not translated
+        for line in f:
+            lineBreak = '\r\n' if line.endswith('\r\n') else line[-1] if line[-1] in '\r\n' else ''
+            if separator is None and lineBreak:
+                separator = lineBreak
+            endsWithBreak = lineBreak != ''
+            lines.append(line[:len(line) - len(lineBreak)])
+    if endsWithBreak:
+        lines.append('')
+    return lines, separator if separator is not None else '\n'
+
+def diffLines(oldLines:list[str], newLines:list[str]) -> list[DiffHunk]:
+    '''Compares two lists of lines and returns changed regions as DiffHunks.'''
+    return [DiffHunk(LocationRange(Location(oldStart, 0), Location(oldEnd, 0)), LocationRange(Location(newStart, 0), Location(newEnd, 0)))
+            for oldStart, oldEnd, newStart, newEnd in _diffRows(oldLines, newLines)]
+
+def _diffTextsInProcess(oldText:str, newText:str) -> list[tuple]:
+    '''Runs in worker process -> texts are sent as strings (cheaper to pickle) and split like in headless TextEditorModel.'''
+    return _diffRows(TextEditorModel(oldText).lines, TextEditorModel(newText).lines)
+
+def _diffRows(oldLines:list[str], newLines:list[str]) -> list[tuple]:
+    '''
+    Returns changed regions as tuples (oldStart, oldEnd, newStart, newEnd).
+    Every line is replaced by hash id, so comparing lines is comparing ints. Lines which are unique in both documents
+    are used as anchors (patience diff) and regions between anchors are compared by Myers algorithm.
+    '''
+    ids = {}
+    a = [ids.setdefault(line, len(ids)) for line in oldLines]
+    b = [ids.setdefault(line, len(ids)) for line in newLines]
+
+    # patience anchors -> lines which appear exactly once in both documents, in the same order
+    counts = {}
+    for i, h in enumerate(a):
+        counts[h] = (counts[h][0] + 1, i, -1) if h in counts else (1, i, -1)
+    for j, h in enumerate(b):
+        if h in counts:
+            countA, i, firstJ = counts[h]
+            counts[h] = (countA, i, j if firstJ == -1 else -2)
+    candidates = sorted((i, j) for countA, i, j in counts.values() if countA == 1 and j >= 0)
+    anchors = _longestIncreasingByNew(candidates)
+
+    rows = []
+    oldStart = newStart = 0
+    for i, j in anchors + [(len(a), len(b))]:
+        for oldS, oldE, newS, newE in _myersRows(a, oldStart, i, b, newStart, j):
+            rows.append((oldS, oldE, newS, newE))
+        oldStart, newStart = i + 1, j + 1
+    return rows
+
+def _longestIncreasingByNew(pairs:list[tuple]) -> list[tuple]:
+    '''From pairs sorted by old index takes longest subsequence where new index is increasing too (patience sorting).'''
+    tails = []      # tails[k] = smallest new index which ends increasing subsequence of length k+1
+    tailIndexes = []
+    previous = [-1] * len(pairs)
+    for index, (i, j) in enumerate(pairs):
+        k = bisect_left(tails, j)
+        if k > 0:
+            previous[index] = tailIndexes[k-1]
+        if k == len(tails):
+            tails.append(j)
+            tailIndexes.append(index)
+        else:
+            tails[k] = j
+            tailIndexes[k] = index
+    result = []
+    index = tailIndexes[-1] if tailIndexes else -1
+    while index != -1:
+        result.append(pairs[index])
+        index = previous[index]
+    result.reverse()
+    return result
+
+def _myersRows(a:list[int], oldStart:int, oldEnd:int, b:list[int], newStart:int, newEnd:int) -> list[tuple]:
+    '''Myers diff of a[oldStart:oldEnd] and b[newStart:newEnd]. Returns changed regions (in absolute indexes).'''
+    # common prefix and suffix are not changed -> skip them
+    while oldStart < oldEnd and newStart < newEnd and a[oldStart] == b[newStart]:
+        oldStart += 1
+        newStart += 1
+    while oldStart < oldEnd and newStart < newEnd and a[oldEnd-1] == b[newEnd-1]:
+        oldEnd -= 1
+        newEnd -= 1
+    n, m = oldEnd - oldStart, newEnd - newStart
+    if n == 0 or m == 0:
+        return [(oldStart, oldEnd, newStart, newEnd)] if n or m else []
+
+    # trace[d][k+d] = furthest x on diagonal k = x - y after d edits
+    trace = []
+    previous = None
+    for d in range(min(n + m, DIFF_MAX_EDIT_DISTANCE) + 1):
+        current = [0] * (2*d + 1)
+        for k in range(-d, d+1, 2):
+            if d == 0:
+                x = 0
+            elif k == -d or (k != d and previous[k-1+d-1] < previous[k+1+d-1]):
+                x = previous[k+1+d-1]       # step down -> line inserted from b
+            else:
+                x = previous[k-1+d-1] + 1   # step right -> line deleted from a
+            y = x - k
+            while x < n and y < m and a[oldStart+x] == b[newStart+y]:
+                x += 1
+                y += 1
+            current[k+d] = x
+            if x >= n and y >= m:
+                trace.append(current)
+                return _myersBacktrack(trace, n, m, oldStart, newStart)
+        trace.append(current)
+        previous = current
+    # too many differences -> whole region is reported as one change
+    return [(oldStart, oldEnd, newStart, newEnd)]
+
+def _myersBacktrack(trace:list[list[int]], n:int, m:int, oldStart:int, newStart:int) -> list[tuple]:
+    '''Walks back through Myers trace and groups neighbouring deletions and insertions into regions.'''
+    edits = []     # (x, y, isDeletion) in reversed order
+    x, y = n, m
+    for d in range(len(trace)-1, 0, -1):
+        previous = trace[d-1]
+        k = x - y
+        if k == -d or (k != d and previous[k-1+d-1] < previous[k+1+d-1]):
+            previousK = k + 1
+        else:
+            previousK = k - 1
+        previousX = previous[previousK+d-1]
+        previousY = previousX - previousK
+        edits.append((previousX, previousY, previousK == k - 1))
+        x, y = previousX, previousY
+    edits.reverse()
+
+    rows = []
+    for x, y, isDeletion in edits:
+        if rows and rows[-1][1] == x and rows[-1][3] == y:
+            oldS, oldE, newS, newE = rows[-1]
+            rows[-1] = (oldS, oldE + isDeletion, newS, newE + (not isDeletion))
+        else:
+            rows.append((x, x + isDeletion, y, y + (not isDeletion)))
+    return [(oldStart + oldS, oldStart + oldE, newStart + newS, newStart + newE) for oldS, oldE, newS, newE in rows]
+
+
+_diffExecutor = None
+
+def getDiffExecutor() -> ProcessPoolExecutor:
+    '''Returns process pool used for comparing big documents (created on first use).'''
+    global _diffExecutor
+    if _diffExecutor is None:
+        _diffExecutor = ProcessPoolExecutor(max_workers=1)
+    return _diffExecutor
+
+def resetDiffExecutor():
+    '''Drops broken process pool, next getDiffExecutor() creates new one.'''
+    global _diffExecutor
+    if _diffExecutor is not None:
+        _diffExecutor.shutdown(wait=False, cancel_futures=True)
+        _diffExecutor = None
+
+
+class DocumentDiff(EditObserver):
+    '''
+    Compares text of TextEditorModel with reference lines (file on disk or another document).
+    Changed regions are kept as marks, so they move with text while user edits, and comparison is refreshed
+    by calling refresh() periodically. Only rows changed since last comparison (with hunks touching them) are compared
+    again, expensive comparisons run in another process.
+    This class is subject for diff observers.
+    '''
+    def __init__(self, textEditorModel:TextEditorModel, referenceLines:list[str], executor:ProcessPoolExecutor=None):
+        self.textEditorModel = textEditorModel
+        self.referenceLines = list(referenceLines)
+        self.executor = executor
+        self.hunkMarks = []     # list of (oldStartRow, oldEndRow, startMark, endMark) ordered by rows
+        self.pending = None     # (future, window, deltas made after comparison started)
+        self.dirty = None       # (start, end) locations of text changed since last comparison
+        self._markAllDirty()
+        self.diffObservers: list[DiffObserver] = []
+        self.textEditorModel.attachEditObserver(self)
+
+    def attachDiffObserver(self, observer:'DiffObserver'):
+        self.diffObservers.append(observer)
+    def dettachDiffObserver(self, observer:'DiffObserver'):
+        if observer in self.diffObservers:
+            self.diffObservers.remove(observer)
+    def notifyDiffObservers(self):
+        for o in self.diffObservers:
+            o.updateDiff()
+
+    def updateEdit(self, delta:EditDelta):
+        '''Text changed -> marks already moved, but changed rows have to be compared again.'''
+        if self.dirty is None:
+            self.dirty = (delta.start, delta.newEnd)
+        else:
+            start, end = self.dirty
+            self.dirty = (min(delta.shiftLocation(start), delta.start), max(delta.shiftLocation(end), delta.newEnd))
+        if self.pending is not None:
+            self.pending[2].append(delta)
+
+    def hunks(self) -> list[DiffHunk]:
+        '''Returns all current changed regions.'''
+        return [self._hunk(index) for index in range(len(self.hunkMarks))]
+
+    def hunksInRows(self, firstRow:int, lastRow:int) -> list[DiffHunk]:
+        '''Returns changed regions which touch rows firstRow until lastRow (used for drawing only the visible part).'''
+        result = []
+        index = self._firstEndingAtOrAfter(firstRow)
+        while index < len(self.hunkMarks) and self.hunkMarks[index][2].location.row <= lastRow:
+            result.append(self._hunk(index))
+            index += 1
+        return result
+
+    def _hunk(self, index:int) -> DiffHunk:
+        oldStart, oldEnd, startMark, endMark = self.hunkMarks[index]
+        return DiffHunk(LocationRange(Location(oldStart, 0), Location(oldEnd, 0)),
+                        LocationRange(Location(startMark.location.row, 0), Location(endMark.location.row, 0)))
+
+    def _firstEndingAtOrAfter(self, row:int) -> int:
+        '''Binary search -> index of first hunk whose end row is at least row (hunks don't overlap, so end rows are ordered).'''
+        low, high = 0, len(self.hunkMarks)
+        while low < high:
+            middle = (low + high) // 2
+            if self.hunkMarks[middle][3].location.row < row:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _firstStartingAfter(self, row:int) -> int:
+        low, high = 0, len(self.hunkMarks)
+        while low < high:
+            middle = (low + high) // 2
+            if self.hunkMarks[middle][2].location.row <= row:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _markAllDirty(self):
+        lines = self.textEditorModel.lines
+        self.dirty = (Location(0, 0), Location(len(lines) - 1, len(lines[-1])))
+
+    def _window(self) -> tuple[int, int, int, int, int, int]:
+        '''
+        Returns part of documents which has to be compared again: (first hunk, hunk after last hunk, oldStart, oldEnd,
+        newStart, newEnd). It covers changed rows and hunks touching them, rows around it are unchanged,
+        so old rows are found from neighbouring hunks.
+        '''
+        firstDirty, lastDirty = self.dirty[0].row, self.dirty[1].row
+        first = self._firstEndingAtOrAfter(firstDirty)
+        last = self._firstStartingAfter(lastDirty + 1)
+        newStart, newEnd = firstDirty, lastDirty + 1
+        if first < last:
+            newStart = min(newStart, self.hunkMarks[first][2].location.row)
+            newEnd = max(newEnd, self.hunkMarks[last-1][3].location.row)
+        if first > 0:
+            previous = self.hunkMarks[first-1]
+            oldStart = previous[1] + newStart - previous[3].location.row
+        else:
+            oldStart = newStart
+        if last < len(self.hunkMarks):
+            following = self.hunkMarks[last]
+            oldEnd = following[0] - (following[2].location.row - newEnd)
+        else:
+            oldEnd = len(self.referenceLines) - (len(self.textEditorModel.lines) - newEnd)
+        return first, last, oldStart, oldEnd, newStart, newEnd
+
+    def refresh(self) -> bool:
+        '''
+        Collects finished comparison and starts new one if text changed.
+        Never waits for worker process. Returns True if hunks changed.
+        '''
+        changed = False
+        if self.pending is not None:
+            future, window, deltas = self.pending
+            if not future.done():
+                return False
+            self.pending = None
+            try:
+                rows = future.result()
+            except Exception as e:
+                # comparison failed -> compare everything again next time (with new pool if worker died)
+                if isinstance(e, BrokenProcessPool) and self.executor is None:
+                    resetDiffExecutor()
+                self._markAllDirty()
+                return False
+            self._replaceHunks(window, rows, deltas)
+            changed = True
+        if self.dirty is not None:
+            window = self._window()
+            first, last, oldStart, oldEnd, newStart, newEnd = window
+            self.dirty = None
+            oldLines, newLines = self.referenceLines[oldStart:oldEnd], self.textEditorModel.lines[newStart:newEnd]
+            n, m = len(oldLines), len(newLines)
+            if n == 0 or m == 0:
+                self._replaceHunks(window, [(0, n, 0, m)] if n or m else [], [])
+                changed = True
+            elif n + m + min(n + m, DIFF_MAX_EDIT_DISTANCE) ** 2 > DIFF_PROCESS_COST:
+                executor = self.executor if self.executor is not None else getDiffExecutor()
+                future = executor.submit(_diffTextsInProcess, '\r'.join(oldLines), '\r'.join(newLines))
+                self.pending = (future, window, [])
+            else:
+                self._replaceHunks(window, _diffRows(oldLines, newLines), [])
+                changed = True
+        if changed:
+            self.notifyDiffObservers()
+        return changed
+
+    def _replaceHunks(self, window:tuple, rows:list[tuple], deltas:list[EditDelta]):
+        '''
+        Replaces hunks inside window by rows (relative to window). Marks of other hunks are not touched.
+        Rows were computed before given deltas were made -> they are shifted through them.
+        '''
+        first, last, oldStart, oldEnd, newStart, newEnd = window
+        model = self.textEditorModel
+        for _, _, startMark, endMark in self.hunkMarks[first:last]:
+            model.removeMark(startMark)
+            model.removeMark(endMark)
+        hunkMarks = []
+        for oldS, oldE, newS, newE in rows:
+            start, end = Location(newStart + newS, 0), Location(newStart + newE, 0)
+            for delta in deltas:
+                start, end = delta.shiftLocation(start), delta.shiftLocation(end)
+            hunkMarks.append((oldStart + oldS, oldStart + oldE, model.addMark(start), model.addMark(end)))
+        self.hunkMarks[first:last] = hunkMarks
+
+    def close(self):
+        '''Stops comparing and removes all marks from model.'''
+        self.textEditorModel.dettachEditObserver(self)
+        for _, _, startMark, endMark in self.hunkMarks:
+            self.textEditorModel.removeMark(startMark)
+            self.textEditorModel.removeMark(endMark)
+        self.hunkMarks = []
+        if self.pending is not None:
+            self.pending[0].cancel()
+            self.pending = None
+
+class DiffObserver:
+    '''Observer for changes of compared regions.'''
+    def updateDiff(self):
+        pass
+
+class TextEditor(Canvas, CursorObserver, TextObserver, ClipboardObserver, DiffObserver):
     '''Component that lets to its users monitoring and simple editing of text.'''
     def __init__(self, master, textEditorModel:'TextEditorModel', **kwargs):    # 'TextEditorModel' -> forward reference
         super().__init__(master, **kwargs)
@@ -554,7 +1967,9 @@ class TextEditor(Canvas, CursorObserver, TextObserver, ClipboardObserver):
         self.clipboard = ClipboardStack()     # clipboardStack
         self.clipboard.attachClipboardObserver(self)
         self.shiftHeld = False
-        self.oldCursorLoc = None    # marks starting location of cursor when shift is pressed
+        self.documentDiff = None    # comparison with other document (if user started it)
+        self.diffRefreshId = None   # id of scheduled refreshDiff() call
+        self.topRow = 0     # first row shown on canvas (only visible rows are drawn)
         self.deleteAllAndDraw()
 
         # binding buttons
@@ -574,10 +1989,12 @@ class TextEditor(Canvas, CursorObserver, TextObserver, ClipboardObserver):
         self.bind('<Control-Shift-V>', lambda event: self.handle_paste_and_pop())
         self.bind('<Control-z>', lambda event: UndoManager().undo())
         self.bind('<Control-y>', lambda event: UndoManager().redo())
+        self.bind('<Control-bracketleft>', lambda event: self.fold_block())
+        self.bind('<Control-bracketright>', lambda event: self.unfold_block())
     
     def handle_copy(self):
-        '''Current selection (if existant) pushes back in clipboard.'''
-        selectedText = self.textEditorModel.getSelectionRangeText()
+        '''Current selection (if existant) pushes back in clipboard. Only lazy view is stored, text is not copied.'''
+        selectedText = self.textEditorModel.getSelectionView()
         if selectedText:
             self.clipboard.pushInClipboard(selectedText)
         
@@ -597,9 +2014,9 @@ class TextEditor(Canvas, CursorObserver, TextObserver, ClipboardObserver):
     def setShift(self, value: bool):
         '''Stores whether shift is pressed and if so marks starting location of selected partition.'''
         if value == True:
-            self.oldCursorLoc = Location(self.textEditorModel.cursorLocation.row, self.textEditorModel.cursorLocation.column)
-        elif value == False:
-            self.oldCursorLoc = None
+            self.textEditorModel.setSelectionAnchor()
+        else:
+            self.textEditorModel.clearSelectionAnchor()
 
         self.shiftHeld = value
 
@@ -612,11 +2029,11 @@ class TextEditor(Canvas, CursorObserver, TextObserver, ClipboardObserver):
         if self.shiftHeld:
             '''shift pressed -> select section'''
             self.textEditorModel.moveCursorLeft()
-            self.textEditorModel.setSelectionRange(LocationRange(self.oldCursorLoc, self.textEditorModel.cursorLocation))
+            self.textEditorModel.extendSelection()
         else:
             '''shift not pressed'''
             self.textEditorModel.moveCursorLeft()
-            self.textEditorModel.setSelectionRange(LocationRange(self.textEditorModel.cursorLocation, self.textEditorModel.cursorLocation))
+            self.textEditorModel.collapseSelection()
     
     def move_cursore_right(self):
         '''
@@ -626,11 +2043,11 @@ class TextEditor(Canvas, CursorObserver, TextObserver, ClipboardObserver):
         if self.shiftHeld:
             '''shift pressed -> select section'''
             self.textEditorModel.moveCursorRight()
-            self.textEditorModel.setSelectionRange(LocationRange(self.oldCursorLoc, self.textEditorModel.cursorLocation))
+            self.textEditorModel.extendSelection()
         else:
             '''shift not pressed'''
             self.textEditorModel.moveCursorRight()
-            self.textEditorModel.setSelectionRange(LocationRange(self.textEditorModel.cursorLocation, self.textEditorModel.cursorLocation))
+            self.textEditorModel.collapseSelection()
     
     def move_cursore_up(self):
         '''
@@ -640,11 +2057,11 @@ class TextEditor(Canvas, CursorObserver, TextObserver, ClipboardObserver):
         if self.shiftHeld:
             '''shift pressed -> select section'''
             self.textEditorModel.moveCursorUp()
-            self.textEditorModel.setSelectionRange(LocationRange(self.oldCursorLoc, self.textEditorModel.cursorLocation))
+            self.textEditorModel.extendSelection()
         else:
             '''shift not pressed'''
             self.textEditorModel.moveCursorUp()
-            self.textEditorModel.setSelectionRange(LocationRange(self.textEditorModel.cursorLocation, self.textEditorModel.cursorLocation))
+            self.textEditorModel.collapseSelection()
 
     def move_cursore_down(self):
         '''
@@ -654,12 +2071,27 @@ class TextEditor(Canvas, CursorObserver, TextObserver, ClipboardObserver):
         if self.shiftHeld:
             '''shift pressed -> select section'''
             self.textEditorModel.moveCursorDown()
-            self.textEditorModel.setSelectionRange(LocationRange(self.oldCursorLoc, self.textEditorModel.cursorLocation))
+            self.textEditorModel.extendSelection()
         else:
             '''shift not pressed'''
             self.textEditorModel.moveCursorDown()
-            self.textEditorModel.setSelectionRange(LocationRange(self.textEditorModel.cursorLocation, self.textEditorModel.cursorLocation))
+            self.textEditorModel.collapseSelection()
     
+    def fold_block(self):
+        '''Folds selected rows, or indented block under cursor row if nothing is selected.'''
+        range = self.textEditorModel.getSelectionRange()
+        start, end = range.startingCoordinate, range.endingCoordinate
+        if start != end:
+            if start > end:
+                start, end = end, start
+            self.textEditorModel.fold(start.row, end.row)
+        else:
+            self.textEditorModel.foldIndentationBlock(self.textEditorModel.cursorLocation.row)
+
+    def unfold_block(self):
+        '''Unfolds region at cursor row.'''
+        self.textEditorModel.unfold(self.textEditorModel.cursorLocation.row)
+
     def delete_before(self):
         '''Determines whether it has to remove one char or the whole section.'''
         range = self.textEditorModel.getSelectionRange()
@@ -683,16 +2115,58 @@ class TextEditor(Canvas, CursorObserver, TextObserver, ClipboardObserver):
             self.textEditorModel.deleteAfter()
 
     def updateCursorLocation(self, loc: Location):
+        if self.scrollToCursor():
+            '''viewport moved -> everything has to be drawn again'''
+            self.updateText()
+            return
         self.delete('cursor')
         x = COLLUMN_START + loc.column * CHAR_WIDTH
-        y1 = loc.row * ROW_HEIGHT
+        y1 = self.rowToY(loc.row)
         y2 = y1 + ROW_HEIGHT
         self.create_line(x, y1, x, y2, fill='black', tags='cursor')
 
+    def visibleRowCount(self) -> int:
+        '''Number of rows which fit on canvas (last one can be visible only partly).'''
+        height = self.winfo_height()
+        if height <= 1:
+            '''canvas is not shown yet -> use requested height'''
+            height = int(self.cget('height'))
+        return height // ROW_HEIGHT + 1
+
+    def visibleRows(self) -> list[int]:
+        '''Returns rows of document which are visible on canvas (folded rows are skipped).'''
+        folds = self.textEditorModel.folds
+        top = folds.logicalToVisible(self.topRow)
+        lineCount = len(self.textEditorModel.lines) - folds.hiddenRowCount()
+        return [folds.visibleToLogical(v) for v in range(top, min(lineCount, top + self.visibleRowCount()))]
+
+    def rowToY(self, row: int) -> int:
+        '''Returns y coordinate of top of given row. Folded row gets coordinate of its header.'''
+        folds = self.textEditorModel.folds
+        return (folds.logicalToVisible(row) - folds.logicalToVisible(self.topRow)) * ROW_HEIGHT
+
+    def scrollToCursor(self) -> bool:
+        '''Moves viewport so that cursor is visible. Returns True if viewport moved.'''
+        folds = self.textEditorModel.folds
+        cursorRow = folds.logicalToVisible(self.textEditorModel.cursorLocation.row)
+        topRow = folds.logicalToVisible(self.topRow)
+        fullyVisible = max(self.visibleRowCount() - 1, 1)
+        if cursorRow < topRow:
+            topRow = cursorRow
+        elif cursorRow >= topRow + fullyVisible:
+            topRow = cursorRow - fullyVisible + 1
+        newTopRow = folds.visibleToLogical(topRow)  # also moves viewport away from rows which were folded
+        if newTopRow == self.topRow:
+            return False
+        self.topRow = newTopRow
+        return True
+
     def updateText(self):
         '''Updates text.'''
         self.delete('all')
-        # If section is selected -> show it as light blue corridore
+        self.scrollToCursor()
+        self.drawDiff()
+        # If section is selected -> show it as light blue corridore (only its visible part)
         selection = self.textEditorModel.getSelectionRange()
         start = selection.startingCoordinate
         end = selection.endingCoordinate
@@ -701,31 +2175,130 @@ class TextEditor(Canvas, CursorObserver, TextObserver, ClipboardObserver):
             if start > end:
                 start, end = end, start
 
-            for row in range(start.row, end.row + 1):
+            for row in self.visibleRows():
+                if row < start.row or row > end.row:
+                    continue
                 line = self.textEditorModel.lines[row]
                 col_start = start.column if row == start.row else 0
                 col_end = end.column if row == end.row else len(line)
                 x1 = COLLUMN_START + col_start * CHAR_WIDTH
                 x2 = COLLUMN_START + col_end * CHAR_WIDTH
-                y1 = row * ROW_HEIGHT
+                y1 = self.rowToY(row)
                 y2 = y1 + ROW_HEIGHT
                 self.create_rectangle(x1, y1, x2, y2, fill="lightblue", outline='', tags="selection")
         
         self.draw()
 
     def draw(self):
-        '''This method draws text and cursor on a canvas.'''
+        '''This method draws text and cursor on a canvas. Only visible rows are drawn.'''
         # managing text
-        for i, line in self.textEditorModel.allLines():
-            self.create_text(COLLUMN_START, i*ROW_HEIGHT, anchor='nw', text=line, font=('Courier',14))  # anchor=nw -> north-west (reff point for coord)
+        for i in self.visibleRows():
+            line = self.textEditorModel.lines[i]
+            self.create_text(COLLUMN_START, self.rowToY(i), anchor='nw', text=line, font=('Courier',14))  # anchor=nw -> north-west (reff point for coord)
+            if self.textEditorModel.folds.foldAt(i) is not None:
+                '''header of folded region -> show that rows are hidden'''
+                self.create_text(COLLUMN_START + (len(line) + 1) * CHAR_WIDTH, self.rowToY(i), anchor='nw', text='...', fill='gray', font=('Courier',14), tags='fold')
         # managing cursor
         cursor = self.textEditorModel.cursorLocation
-        line = self.textEditorModel.lines[cursor.row]
         x = COLLUMN_START + cursor.column * CHAR_WIDTH
-        y1 = cursor.row * ROW_HEIGHT
+        y1 = self.rowToY(cursor.row)
         y2 = y1 + ROW_HEIGHT
         self.create_line(x, y1, x, y2, fill="black", tags='cursor')
 
+    def drawDiff(self):
+        '''Draws changed regions of compared document: marker in gutter and background of changed rows.'''
+        if self.documentDiff is None:
+            return
+        visible = self.visibleRows()
+        firstRow, lastRow = visible[0], visible[-1]
+        for hunk in self.documentDiff.hunksInRows(firstRow, lastRow + 1):
+            startRow = hunk.newRange.startingCoordinate.row
+            endRow = hunk.newRange.endingCoordinate.row
+            if endRow < firstRow or startRow > lastRow + 1:
+                continue
+            if hunk.isDeleted():
+                # deleted lines have no rows in this document -> red line between rows
+                y = self.rowToY(startRow)
+                self.create_line(0, y, COLLUMN_START + 4 * CHAR_WIDTH, y, fill='#cf222e', width=2, tags='diff')
+                continue
+            markerColor, backgroundColor = ('#2da44e', '#e6ffec') if hunk.isAdded() else ('#d4a72c', '#fff5b1')
+            y1 = self.rowToY(max(startRow, firstRow))
+            y2 = self.rowToY(min(endRow - 1, lastRow)) + ROW_HEIGHT
+            self.create_rectangle(COLLUMN_START, y1, self.winfo_reqwidth(), y2, fill=backgroundColor, outline='', tags='diff')
+            self.create_rectangle(0, y1, GUTTER_WIDTH, y2, fill=markerColor, outline='', tags='diff')
+
+    def compareWith(self, referenceLines:list[str]):
+        '''Starts comparing text with given lines. Differences are shown and refreshed while user edits.'''
+        self.stopCompare()
+        self.documentDiff = DocumentDiff(self.textEditorModel, referenceLines)
+        self.documentDiff.attachDiffObserver(self)
+        self.refreshDiff()
+
+    def compareWithFile(self, path:str=None):
+        '''Compares text with file on disk (asks for file if path is not given).'''
+        if path is None:
+            path = filedialog.askopenfilename()
+            if not path:
+                return
+        self.compareWith(readFileLines(path))
+
+    def stopCompare(self):
+        '''Stops comparing and removes highlights.'''
+        if self.diffRefreshId is not None:
+            self.after_cancel(self.diffRefreshId)
+            self.diffRefreshId = None
+        if self.documentDiff is not None:
+            self.documentDiff.close()
+            self.documentDiff = None
+            self.updateText()
+
+    def refreshDiff(self):
+        '''Periodically refreshes comparison. It never blocks -> big documents are compared in another process.'''
+        self.diffRefreshId = None
+        if self.documentDiff is None:
+            return
+        try:
+            self.documentDiff.refresh()
+        finally:
+            # refreshing goes on even if one comparison failed
+            self.diffRefreshId = self.after(DIFF_REFRESH_MS, self.refreshDiff)
+
+    def saveSelection(self, path:str=None):
+        '''Writes selected text into file (asks for file if path is not given). Text is streamed row by row.'''
+        selectedText = self.textEditorModel.getSelectionView()
+        if path is None:
+            path = filedialog.asksaveasfilename()
+            if not path:
+                return
+        with open(path, 'w', encoding='utf-8') as f:
+            selectedText.writeTo(f, '\n')
+
+    def startMacro(self):
+        self.textEditorModel.startMacroRecording()
+
+    def stopMacro(self, path:str=None):
+        '''Stops recording and saves macro (asks for file if path is not given).'''
+        macro = self.textEditorModel.stopMacroRecording()
+        if macro is None:
+            return
+        if path is None:
+            path = filedialog.asksaveasfilename(defaultextension='.json')
+            if not path:
+                return
+        macro.save(path)
+
+    def replayMacro(self, path:str=None):
+        '''Loads macro and replays it on current text.'''
+        if path is None:
+            path = filedialog.askopenfilename()
+            if not path:
+                return
+        self.textEditorModel.replayMacro(Macro.load(path))
+
+    def updateDiff(self):
+        '''Comparison finished -> redraw highlights.'''
+        self.updateText()
+
     def deleteAllAndDraw(self):
         '''
         Wrapper around draw method.
@@ -735,10 +2308,10 @@ class TextEditor(Canvas, CursorObserver, TextObserver, ClipboardObserver):
         self.draw()
     
     def updateClipboard(self):
-        '''Updates clipboard. Perhaps show it in status bar.'''
+        '''Updates clipboard. Its state is shown in status bar.'''
     
     def delete_document(self):
-        self.textEditorModel.setSelectionRange(LocationRange(Location(0,0), Location(len(self.textEditorModel.lines)-1, len(self.textEditorModel.lines[len(self.textEditorModel.lines)-1]))))
+        self.textEditorModel.selectAll()
         self.delete_before()
     
     def moveCursorAtDocumentStart(self):
@@ -753,59 +2326,115 @@ class TextEditor(Canvas, CursorObserver, TextObserver, ClipboardObserver):
         while self.textEditorModel.moveCursorRight():
             continue
 
+class StatusBar(Label, CursorObserver, TextObserver, ClipboardObserver):
+    '''Shows cursor location, document statistics, size of selection and number of texts in clipboard.'''
+    def __init__(self, master, textEditorModel:TextEditorModel, clipboard:ClipboardStack, **kwargs):
+        super().__init__(master, anchor='w', **kwargs)
+        self.textEditorModel = textEditorModel
+        self.clipboard = clipboard
+        self.textEditorModel.attachCursorObserver(self)
+        self.textEditorModel.attachTextObserver(self)
+        self.clipboard.attachClipboardObserver(self)
+        self.refresh()
+
+    def updateCursorLocation(self, loc: Location):
+        self.refresh()
+
+    def updateText(self):
+        self.refresh()
+
+    def updateClipboard(self):
+        self.refresh()
+
+    def refresh(self):
+        '''Every value is kept by model -> refreshing does not depend on size of document.'''
+        cursor = self.textEditorModel.cursorLocation
+        statistics = self.textEditorModel.statistics
+        text = f"Ln {cursor.row + 1}, Col {cursor.column + 1} | {statistics.lineCount} lines, {statistics.characterCount} characters, {statistics.wordCount} words"
+        selectedCharacters, selectedWords = self.textEditorModel.getSelectionSize()
+        if selectedCharacters:
+            text += f" | Selected: {selectedCharacters} characters, {selectedWords} words"
+        if self.clipboard.isTextInClipboardPresent():
+            text += f" | Clipboard: {len(self.clipboard.texts)}"
+        self.config(text=text)
+
 # main
-root = Tk()
-root.title("Text Editor")
-
-textEditor = TextEditor(root, TextEditorModel("Ovo je moj prvi tekst editor.\rOvo je drugi redak,\rdok je ovo treći."), width=400, height=400)
-# Toolbar (Frame + Buttons)
-toolbar = Frame(root, bd=1, relief=RAISED)
-
-spacer = Label(toolbar)
-spacer.pack(side=LEFT, expand=True)
-undoButton = Button(toolbar, text="Undo", command=UndoManager().undo)
-undoButton.pack(side=LEFT, padx=2, pady=2)
-redoButton = Button(toolbar, text="Redo", command=UndoManager().redo)
-redoButton.pack(side=LEFT, padx=2, pady=2)
-cutButton = Button(toolbar, text="Cut", command=textEditor.handle_cut)
-cutButton.pack(side=LEFT, padx=2, pady=2)
-copyButton = Button(toolbar, text="Copy", command=textEditor.handle_copy)
-copyButton.pack(side=LEFT, padx=2, pady=2)
-pasteButton = Button(toolbar, text="Paste", command=textEditor.handle_paste)
-pasteButton.pack(side=LEFT, padx=2, pady=2)
-
-toolbar.pack(side=TOP, fill=X)
-textEditor.pack()
-
-menuBar = Menu(root)
-
-# file menu
-fileMenu = Menu(menuBar, tearoff=0)
-fileMenu.add_command(label='Open')
-fileMenu.add_command(label='Save')
-fileMenu.add_command(label='Exit')
-menuBar.add_cascade(label='File', menu=fileMenu)
-
-# edit menu
-editMenu = Menu(menuBar, tearoff=0)
-editMenu.add_command(label='Undo', command=UndoManager().undo)
-editMenu.add_command(label='Redo', command=UndoManager().redo)
-editMenu.add_command(label='Cut', command=textEditor.handle_cut)
-editMenu.add_command(label='Copy', command=textEditor.handle_copy)
-editMenu.add_command(label='Paste', command=textEditor.handle_paste)
-editMenu.add_command(label='Paste and Take', command=textEditor.handle_paste_and_pop)
-editMenu.add_command(label='Delete selection', command=textEditor.delete_before)    # giving delete_before or after bc if selection is given it deletes it
-editMenu.add_command(label='Clear document', command=textEditor.delete_document)
-menuBar.add_cascade(label='Edit', menu=editMenu)
-
-# move menu
-moveMenu = Menu(menuBar, tearoff=0)
-moveMenu.add_command(label='Cursor to document start', command=textEditor.moveCursorAtDocumentStart)
-moveMenu.add_command(label='Cursor to document end', command=textEditor.moveCursorAtDocumentEnd)
-menuBar.add_cascade(label='Move', menu=moveMenu)
-
-root.config(menu=menuBar)
-
-
-
-root.mainloop()
\ No newline at end of file
+if __name__ == '__main__':
+    root = Tk()
+    root.title("Text Editor")
+
+    textEditor = TextEditor(root, TextEditorModel("Ovo je moj prvi tekst editor.\rOvo je drugi redak,\rdok je ovo treći."), width=400, height=400)
+    # Toolbar (Frame + Buttons)
+    toolbar = Frame(root, bd=1, relief=RAISED)
+
+    spacer = Label(toolbar)
+    spacer.pack(side=LEFT, expand=True)
+    undoButton = Button(toolbar, text="Undo", command=UndoManager().undo)
+    undoButton.pack(side=LEFT, padx=2, pady=2)
+    redoButton = Button(toolbar, text="Redo", command=UndoManager().redo)
+    redoButton.pack(side=LEFT, padx=2, pady=2)
+    cutButton = Button(toolbar, text="Cut", command=textEditor.handle_cut)
+    cutButton.pack(side=LEFT, padx=2, pady=2)
+    copyButton = Button(toolbar, text="Copy", command=textEditor.handle_copy)
+    copyButton.pack(side=LEFT, padx=2, pady=2)
+    pasteButton = Button(toolbar, text="Paste", command=textEditor.handle_paste)
+    pasteButton.pack(side=LEFT, padx=2, pady=2)
+
+    toolbar.pack(side=TOP, fill=X)
+    textEditor.pack()
+    statusBar = StatusBar(root, textEditor.textEditorModel, textEditor.clipboard, bd=1, relief=SUNKEN)
+    statusBar.pack(side=BOTTOM, fill=X)
+
+    menuBar = Menu(root)
+
+    # file menu
+    fileMenu = Menu(menuBar, tearoff=0)
+    fileMenu.add_command(label='Open')
+    fileMenu.add_command(label='Save')
+    fileMenu.add_command(label='Save selection as...', command=textEditor.saveSelection)
+    fileMenu.add_command(label='Exit')
+    menuBar.add_cascade(label='File', menu=fileMenu)
+
+    # edit menu
+    editMenu = Menu(menuBar, tearoff=0)
+    editMenu.add_command(label='Undo', command=UndoManager().undo)
+    editMenu.add_command(label='Redo', command=UndoManager().redo)
+    editMenu.add_command(label='Cut', command=textEditor.handle_cut)
+    editMenu.add_command(label='Copy', command=textEditor.handle_copy)
+    editMenu.add_command(label='Paste', command=textEditor.handle_paste)
+    editMenu.add_command(label='Paste and Take', command=textEditor.handle_paste_and_pop)
+    editMenu.add_command(label='Delete selection', command=textEditor.delete_before)    # giving delete_before or after bc if selection is given it deletes it
+    editMenu.add_command(label='Clear document', command=textEditor.delete_document)
+    menuBar.add_cascade(label='Edit', menu=editMenu)
+
+    # move menu
+    moveMenu = Menu(menuBar, tearoff=0)
+    moveMenu.add_command(label='Cursor to document start', command=textEditor.moveCursorAtDocumentStart)
+    moveMenu.add_command(label='Cursor to document end', command=textEditor.moveCursorAtDocumentEnd)
+    menuBar.add_cascade(label='Move', menu=moveMenu)
+
+    # fold menu
+    foldMenu = Menu(menuBar, tearoff=0)
+    foldMenu.add_command(label='Fold block / selection', command=textEditor.fold_block)
+    foldMenu.add_command(label='Unfold', command=textEditor.unfold_block)
+    foldMenu.add_command(label='Unfold all', command=textEditor.textEditorModel.unfoldAll)
+    menuBar.add_cascade(label='Fold', menu=foldMenu)
+
+    # macro menu
+    macroMenu = Menu(menuBar, tearoff=0)
+    macroMenu.add_command(label='Start recording', command=textEditor.startMacro)
+    macroMenu.add_command(label='Stop recording and save...', command=textEditor.stopMacro)
+    macroMenu.add_command(label='Replay macro...', command=textEditor.replayMacro)
+    menuBar.add_cascade(label='Macro', menu=macroMenu)
+
+    # compare menu
+    compareMenu = Menu(menuBar, tearoff=0)
+    compareMenu.add_command(label='Compare with file...', command=textEditor.compareWithFile)
+    compareMenu.add_command(label='Stop comparing', command=textEditor.stopCompare)
+    menuBar.add_cascade(label='Compare', menu=compareMenu)
+
+    root.config(menu=menuBar)
+
+
+
+    root.mainloop()